@@ -1,12 +1,29 @@
 import re as re
 import sys
-from PyQt6.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QPoint,QTimer,QModelIndex
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTableView, QHeaderView, QLineEdit, QItemDelegate, QWidget, QLabel, QGroupBox, QGridLayout, QToolBar, QVBoxLayout
+from PyQt6.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QPoint,QTimer,QModelIndex, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QMainWindow, QTableView, QHeaderView, QLineEdit, QItemDelegate, QWidget, QLabel, QGroupBox, QGridLayout, QToolBar, QVBoxLayout, QCompleter
 from PyQt6.QtGui import QColor, QAction, QIcon
 from functools import partial
-from collections import UserList, defaultdict
+from collections import defaultdict, OrderedDict, deque
+from collections.abc import MutableSequence
+from itertools import compress, islice
+from array import array
+from bisect import bisect_left, bisect_right
 import random
 import functools
+import operator
+import os
+import zlib
+import time
+import statistics
+import heapq
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from contextlib import contextmanager, ExitStack
+# numpy is optional.  If it's there, numeric filters get done on whole columns at once.
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Override the default header in a table so that I can add filter boxes below the columns.
 class SmartHeader(QHeaderView):
@@ -41,6 +58,13 @@ class SmartHeader(QHeaderView):
         # This signal/slot will resize the filter boxes when the column width changes.
         self.sectionResized.connect(self.updateGeometries)
 
+    # Gives a filter box a drop down list of the values in its column to pick from while typing.
+    def setDistinctValues(self, column, values):
+        completer = QCompleter(sorted({str(value) for value in values}), self.filter_boxes[column])
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        self.filter_boxes[column].setCompleter(completer)
+
     def sizeHint(self):
         # Take the current size and add in the padding / size of the boxes.
         # I am overloading this mainly because the filter boxes float on the screen
@@ -96,6 +120,1196 @@ class SmartHeader(QHeaderView):
             filter_box.resize(self.sectionSize(pos), box_height)
                 
             
+# Bitmaps of which rows match a filter are stored as a bytearray with one byte (0 or 1) per row.  These
+#   functions combine them.  A mask of None means every row.
+def maskAnd(mask1, mask2):
+    if mask1 is None: return mask2
+    if mask2 is None: return mask1
+    # Doing it as one big integer lets python do the whole thing in C instead of looping over the bytes.
+    combined = int.from_bytes(mask1, 'little') & int.from_bytes(mask2, 'little')
+    return bytearray(combined.to_bytes(len(mask1), 'little'))
+
+def maskOr(mask1, mask2):
+    if mask1 is None or mask2 is None: return None
+    combined = int.from_bytes(mask1, 'little') | int.from_bytes(mask2, 'little')
+    return bytearray(combined.to_bytes(len(mask1), 'little'))
+
+# Flips every bit.  If 'within' is given, the result is limited to the rows set in it.
+mask_invert_table = bytes([1, 0]) + bytes(254)
+def maskNot(mask, within=None):
+    return maskAnd(mask.translate(mask_invert_table), within)
+
+# The values in one column of a table.  On top of the values themselves, this builds and holds onto extra
+#   versions of the data that make filtering faster, the first time a filter asks for them.  Anything that
+#   changes a value has to call clearCache() so those never go stale.
+class ColumnData():
+    # Columns shorter than this just get scanned, building a trigram index isn't worth it.
+    trigram_minimum_rows = 50000
+    # The trigram index takes a lot longer to build than one scan, so it only gets built once a regex filter has
+    #   scanned the column this many times without anything in it changing.
+    trigram_build_after = 3
+    # Columns with this many distinct values or fewer get their filters checked once per value instead of once per row.
+    distinct_value_limit = 1000
+
+    def __init__(self):
+        self.numeric_array = None
+        self.trigram_index = None
+        self.trigram_scans = 0
+        self.sorted_index = None
+        self.distinct_values = None
+
+    def clearCache(self):
+        self.numeric_array = None
+        self.trigram_index = None
+        self.trigram_scans = 0
+        self.sorted_index = None
+        self.distinct_values = None
+
+    # If the column only has a few distinct values, returns (values, codes): the distinct values, and an array
+    #   with the position in values of each row's value.  Returns None for columns with too many values.
+    def distinctValues(self):
+        if self.distinct_values is None:
+            self.distinct_values = self.buildDistinctValues() or False
+        return self.distinct_values or None
+
+    def buildDistinctValues(self):
+        values = []
+        codes = array('I')
+        codes_by_value = {}
+        try:
+            for value in self:
+                codes.append(self.valueCode(value, values, codes_by_value))
+                if len(values) > self.distinct_value_limit:
+                    return None
+        except TypeError:
+            # Something in the column can't be hashed
+            return None
+        return (values, codes)
+
+    # Returns the position of 'value' in 'values', adding it to the end if it's new.  'codes_by_value' holds the
+    #   positions so far.  The values are keyed along with their type, otherwise 1, 1.0 and True would all be the
+    #   same value.  Raises a TypeError for values that can't be hashed.
+    @staticmethod
+    def valueCode(value, values, codes_by_value):
+        key = (type(value), value)
+        code = codes_by_value.get(key)
+        if code is None:
+            code = len(values)
+            values.append(value)
+            codes_by_value[key] = code
+        return code
+
+    # Returns a bitmap of the rows whose value passes the 'matches' function, calling it once per distinct value.
+    def distinctMask(self, matches):
+        values, codes = self.distinctValues()
+        value_matched = bytes(map(matches, values))
+        if np is not None:
+            return bytearray(np.frombuffer(value_matched, dtype=np.uint8)[np.asarray(codes)].tobytes())
+        return bytearray(map(value_matched.__getitem__, codes))
+
+    # Returns the column as a numpy float64 array, with NaN for anything that isn't a number.
+    def numericArray(self):
+        if self.numeric_array is None:
+            self.numeric_array = self.buildNumericArray()
+        return self.numeric_array
+
+    def buildNumericArray(self):
+        return np.fromiter(map(self.toFloat, self), dtype=np.float64, count=len(self))
+
+    @staticmethod
+    def toFloat(value):
+        try:
+            return float(value)
+        except:
+            return float('nan')
+
+    # Returns (numbers, rows): every value in the column that's a number, sorted, and the row each one came from.
+    def sortedIndex(self):
+        if self.sorted_index is None:
+            if np is not None:
+                numbers = self.numericArray()
+                # argsort puts the NaNs at the end, so just cut them off.
+                rows = np.argsort(numbers, kind='stable')[:len(numbers) - int(np.isnan(numbers).sum())]
+                self.sorted_index = (numbers[rows], rows)
+            else:
+                pairs = sorted((number, row) for row, number in enumerate(map(self.toFloat, self)) if number == number)
+                self.sorted_index = (array('d', (number for number, row in pairs)), array('q', (row for number, row in pairs)))
+        return self.sorted_index
+
+    # Returns a bitmap of the rows with a number between low and high, found by a binary search of the
+    #   sorted index instead of looking at every row.
+    def rangeMask(self, low, low_inclusive, high, high_inclusive):
+        numbers, rows = self.sortedIndex()
+        if np is not None:
+            start = int(np.searchsorted(numbers, low, side='left' if low_inclusive else 'right'))
+            stop = int(np.searchsorted(numbers, high, side='right' if high_inclusive else 'left'))
+            mask = np.zeros(len(self), dtype=np.uint8)
+            if start < stop:
+                mask[rows[start:stop]] = 1
+            return bytearray(mask.tobytes())
+        start = bisect_left(numbers, low) if low_inclusive else bisect_right(numbers, low)
+        stop = bisect_right(numbers, high) if high_inclusive else bisect_left(numbers, high)
+        mask = bytearray(len(self))
+        for row in rows[start:stop]:
+            mask[row] = 1
+        return mask
+
+    # Returns a dict of every 3 character piece of text in the column -> array of the rows it shows up in.
+    def trigramIndex(self):
+        if self.trigram_index is None:
+            index = defaultdict(lambda: array('I'))
+            for row, value in enumerate(self):
+                text = str(value)
+                for trigram in {text[start:start + 3] for start in range(len(text) - 2)}:
+                    index[trigram].append(row)
+            self.trigram_index = dict(index)
+        return self.trigram_index
+
+    # Returns a bitmap of the rows that could contain all of the given pieces of text, using the trigram index
+    #   so the rest of the rows never have to be looked at.  Returns None if the index can't help, or isn't
+    #   built yet (see trigram_build_after).  With build False it isn't built or counted as a scan, only used.
+    #   The bitmap can have some extra rows in it, so the real regex still has to be run on them.
+    def trigramCandidates(self, fragments, build=True):
+        if len(self) < self.trigram_minimum_rows:
+            return None
+        trigrams = {fragment[start:start + 3] for fragment in fragments for start in range(len(fragment) - 2)}
+        if not trigrams:
+            return None
+        index = self.trigram_index
+        if index is None:
+            if build is False:
+                return None
+            self.trigram_scans += 1
+            if self.trigram_scans <= self.trigram_build_after:
+                return None
+            index = self.trigramIndex()
+        # Start with the rarest trigram, then intersect with the others.  Once the lists get much bigger than
+        #   what's left it's cheaper to let the regex sort out the rest.
+        row_lists = sorted((index.get(trigram, ()) for trigram in trigrams), key=len)
+        rows = set(row_lists[0])
+        for row_list in row_lists[1:]:
+            if not rows or len(row_list) > 8 * len(rows):
+                break
+            rows.intersection_update(row_list)
+        mask = bytearray(len(self))
+        for row in rows:
+            mask[row] = 1
+        return mask
+
+# A column stored as a plain list.  This is what row based tables hand to the filters (a snapshot taken from
+#   the rows), and it's also how a columnar table stores columns that don't fit anything more compact.
+class SmartColumn(ColumnData, list):
+    def __init__(self, values):
+        list.__init__(self, values)
+        ColumnData.__init__(self)
+
+    def __setitem__(self, row, value):
+        list.__setitem__(self, row, value)
+        self.clearCache()
+
+    def buildNumericArray(self):
+        try:
+            return np.array(self, dtype=np.float64)
+        except (TypeError, ValueError, OverflowError):
+            # Something that isn't a number, or an int too big for a float.  Those become NaN one at a time.
+            return super().buildNumericArray()
+
+# A column of all ints or all floats, stored in a typed array so each cell is 8 bytes instead of a python object.
+class NumericColumn(ColumnData):
+    def __init__(self, typecode, values):
+        super().__init__()
+        self.array = array(typecode, values)
+        self.value_type = int if typecode == 'q' else float
+
+    def __len__(self):
+        return len(self.array)
+
+    def __iter__(self):
+        return iter(self.array)
+
+    def __getitem__(self, row):
+        return self.array[row]
+
+    def __setitem__(self, row, value):
+        # Anything that isn't the same type as the column can't go in the array.  The store will switch
+        #   the column to a different kind when it gets this.
+        if type(value) is not self.value_type:
+            raise TypeError(f"NumericColumn can only hold {self.value_type.__name__}")
+        self.array[row] = value
+        self.clearCache()
+
+    def buildNumericArray(self):
+        return np.array(self.array, dtype=np.float64)
+
+# A column with a lot of repeated values (status, owner, region...).  Each distinct value is stored once, and
+#   every row just holds a small integer code pointing at its value.
+class DictionaryColumn(ColumnData):
+    def __init__(self, values):
+        super().__init__()
+        # The distinct values, in the order they were first seen.  A value's code is its position in here.
+        self.values = []
+        # Each value's code, see valueCode.
+        self.codes_by_value = {}
+        self.codes = array('I')
+        for value in values:
+            self.codes.append(self.codeFor(value))
+
+    def codeFor(self, value):
+        return self.valueCode(value, self.values, self.codes_by_value)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return map(self.values.__getitem__, self.codes)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self.values[code] for code in self.codes[row]]
+        return self.values[self.codes[row]]
+
+    def __setitem__(self, row, value):
+        # codeFor raises a TypeError for values that can't be hashed, and the store switches the column to a list.
+        self.codes[row] = self.codeFor(value)
+        self.clearCache()
+
+    def buildDistinctValues(self):
+        # The encoding already is the list of distinct values.
+        if len(self.values) > self.distinct_value_limit:
+            return None
+        return (self.values, self.codes)
+
+    def buildNumericArray(self):
+        # Only convert each distinct value once, then spread them out over the rows.
+        numbers = np.fromiter(map(self.toFloat, self.values), dtype=np.float64, count=len(self.values))
+        return numbers[np.asarray(self.codes)]
+
+# These classes are the compiled form of whatever got typed into a filter box.  The text is parsed
+#   once when the filter timer fires, and then applyFilters only has to call matches() on each cell
+#   instead of running all the and/or/not/math regex over again for every single row.
+# They're immutable, and two predicates compiled from the same text compare equal, so they can be
+#   stored, compared and timed on their own (print one to see the tree that got built).
+class FilterPredicate():
+    __slots__ = ()
+
+    def matches(self, value):
+        raise NotImplementedError
+
+    # Returns True if this predicate can be worked out with numpy over a whole column at once.  That's
+    #   only the math filters (and and/or/not combinations of them).
+    def vectorizable(self):
+        return False
+
+    # Runs a vectorizable predicate over a numpy array of numbers, returns a numpy bool array.
+    def evaluateArray(self, numbers):
+        raise NotImplementedError
+
+    # If every number this predicate matches falls in one range, returns (low, low inclusive, high, high inclusive).
+    #   Otherwise returns None.
+    def numericRange(self):
+        return None
+
+    # Roughly how much work it is to check one row of 'values' against this predicate, where 1 is about a
+    #   float() and a compare.  The filter planner only uses it to pick an order, so it just has to be close.
+    def estimatedCost(self, values):
+        # The same checks as evaluateIndexed, in the same order
+        if isinstance(values, ColumnData):
+            if self.numericRange() is not None:
+                return 0.01
+            if self.vectorizable():
+                return 0.05
+            if values.distinctValues() is not None:
+                return 0.05
+        return self.scanCost()
+
+    # Returns a bitmap of the rows of a whole column that could match, from an index the column already has, or
+    #   None.  Used when only part of the column gets evaluated, where evaluateColumn can't get at the index.
+    def indexCandidates(self, values):
+        return None
+
+    # The cost of checking a row by calling matches() on it.
+    def scanCost(self):
+        return 1.0
+
+    # Guesses what fraction of the rows will match by trying the predicate on an evenly spaced sample.
+    def sampleSelectivity(self, values, sample_size=256):
+        if len(values) == 0:
+            return 1.0
+        sample = values[::max(len(values) // sample_size, 1)]
+        return sum(map(self.matches, sample)) / len(sample)
+
+    # Works out the predicate using the column's indexes instead of looking at every row, if it can.  A single
+    #   range of numbers gets looked up in the sorted index, and other math gets done with numpy.  Anything
+    #   on a column with only a few distinct values gets checked once per value.  Returns None if none apply.
+    def evaluateIndexed(self, values, candidates):
+        if not isinstance(values, ColumnData):
+            return None
+        numeric_range = self.numericRange()
+        if numeric_range is not None:
+            return maskAnd(values.rangeMask(*numeric_range), candidates)
+        if self.vectorizable():
+            # A numpy bool array is already one 0/1 byte per row, which is exactly my bitmap format.
+            return maskAnd(bytearray(self.evaluateArray(values.numericArray()).tobytes()), candidates)
+        if values.distinctValues() is not None:
+            return maskAnd(values.distinctMask(self.matches), candidates)
+        return None
+
+    # Runs the predicate over every value in a column and returns a bitmap of the matches.  If a candidates
+    #   bitmap is given, only those rows get checked and everything else is left as a 0.
+    def evaluateColumn(self, values, candidates=None):
+        mask = self.evaluateIndexed(values, candidates)
+        if mask is not None:
+            return mask
+        return self.evaluateRows(values, candidates)
+
+    # The slow way: call matches() on each row.
+    def evaluateRows(self, values, candidates=None):
+        if candidates is None:
+            return bytearray(map(self.matches, values))
+        mask = bytearray(len(values))
+        matches = self.matches
+        for row in compress(range(len(values)), candidates):
+            if matches(values[row]):
+                mask[row] = 1
+        return mask
+
+    # Returns True if every value this predicate matches is guaranteed to be matched by 'other' as well.
+    #   When that's true, the new results can only be a subset of the old ones.  False just means
+    #   "can't prove it", not that it isn't a subset.
+    def narrows(self, other):
+        if self == other:
+            return True
+        if isinstance(other, AndPredicate):
+            return all(self.narrows(child) for child in other.children)
+        if isinstance(other, OrPredicate):
+            return any(self.narrows(child) for child in other.children)
+        if isinstance(other, ConstantPredicate):
+            return other.result
+        return False
+
+    # Returns an equivalent predicate in a standard form, so filters that are written differently but mean the
+    #   same thing ("a&&b" and "b&&a", or "!!a" and "a") end up equal.
+    def normalized(self):
+        return self
+
+    # Used by And and Or: flattens nested ones of the same kind, drops repeats and sorts what's left.
+    def normalizedChildren(self):
+        children = set()
+        for child in self.children:
+            child = child.normalized()
+            if type(child) is type(self):
+                children.update(child.children)
+            else:
+                children.add(child)
+        if len(children) == 1:
+            return children.pop()
+        return type(self)(sorted(children, key=repr))
+
+    # The tuple that identifies this predicate.  Used for equality, hashing and printing.
+    def key(self):
+        raise NotImplementedError
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.key()))
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.key()!r}"
+
+    # The key is also what gets passed back into __init__, which is how predicates get pickled over to
+    #   the ProcessFilterEngine's worker processes.
+    def __reduce__(self):
+        return (type(self), self.key())
+
+class AndPredicate(FilterPredicate):
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        object.__setattr__(self, 'children', tuple(children))
+
+    def matches(self, value):
+        # If any of the "AND" values return false then we don't match...
+        for child in self.children:
+            if not child.matches(value):
+                return False
+        return True
+
+    def vectorizable(self):
+        return all(child.vectorizable() for child in self.children)
+
+    def numericRange(self):
+        # The overlap of all the pieces' ranges.
+        ranges = [child.numericRange() for child in self.children]
+        if None in ranges:
+            return None
+        # When two bounds are the same number, the exclusive one is the tighter one.
+        low, low_inclusive = max(((low, low_inclusive) for low, low_inclusive, high, high_inclusive in ranges), key=lambda bound: (bound[0], not bound[1]))
+        high, high_inclusive = min(((high, high_inclusive) for low, low_inclusive, high, high_inclusive in ranges), key=lambda bound: (bound[0], bound[1]))
+        return (low, low_inclusive, high, high_inclusive)
+
+    def evaluateArray(self, numbers):
+        return functools.reduce(np.logical_and, (child.evaluateArray(numbers) for child in self.children))
+
+    def normalized(self):
+        return self.normalizedChildren()
+
+    def scanCost(self):
+        return sum(child.scanCost() for child in self.children)
+
+    def evaluateColumn(self, values, candidates=None):
+        mask = self.evaluateIndexed(values, candidates)
+        if mask is not None:
+            return mask
+        # Each piece only has to look at the rows the pieces before it let through.
+        mask = candidates
+        for child in self.children:
+            mask = child.evaluateColumn(values, mask)
+        return mask
+
+    def narrows(self, other):
+        # Adding another && clause only ever removes matches.
+        return super().narrows(other) or any(child.narrows(other) for child in self.children)
+
+    def key(self):
+        return self.children
+
+    def __reduce__(self):
+        return (type(self), (self.children,))
+
+class OrPredicate(FilterPredicate):
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        object.__setattr__(self, 'children', tuple(children))
+
+    def matches(self, value):
+        # If any of the "OR" values return true then we DO match...
+        for child in self.children:
+            if child.matches(value):
+                return True
+        return False
+
+    def vectorizable(self):
+        return all(child.vectorizable() for child in self.children)
+
+    def evaluateArray(self, numbers):
+        return functools.reduce(np.logical_or, (child.evaluateArray(numbers) for child in self.children))
+
+    def normalized(self):
+        return self.normalizedChildren()
+
+    def scanCost(self):
+        return sum(child.scanCost() for child in self.children)
+
+    def evaluateColumn(self, values, candidates=None):
+        mask = self.evaluateIndexed(values, candidates)
+        if mask is not None:
+            return mask
+        # Each piece only has to look at the rows the pieces before it didn't already match.
+        mask = bytearray(len(values))
+        remaining = candidates
+        for child in self.children:
+            mask = maskOr(mask, child.evaluateColumn(values, remaining))
+            remaining = maskNot(mask, remaining)
+        return mask
+
+    def narrows(self, other):
+        return super().narrows(other) or all(child.narrows(other) for child in self.children)
+
+    def key(self):
+        return self.children
+
+    def __reduce__(self):
+        return (type(self), (self.children,))
+
+class NotPredicate(FilterPredicate):
+    __slots__ = ('child',)
+
+    def __init__(self, child):
+        object.__setattr__(self, 'child', child)
+
+    def matches(self, value):
+        return not self.child.matches(value)
+
+    def vectorizable(self):
+        return self.child.vectorizable()
+
+    def evaluateArray(self, numbers):
+        return np.logical_not(self.child.evaluateArray(numbers))
+
+    def normalized(self):
+        child = self.child.normalized()
+        if isinstance(child, NotPredicate):
+            return child.child
+        return NotPredicate(child)
+
+    def scanCost(self):
+        return self.child.scanCost()
+
+    def evaluateColumn(self, values, candidates=None):
+        mask = self.evaluateIndexed(values, candidates)
+        if mask is not None:
+            return mask
+        return maskNot(self.child.evaluateColumn(values, candidates), candidates)
+
+    def narrows(self, other):
+        # !b is narrower than !a when b is wider than a
+        return super().narrows(other) or (isinstance(other, NotPredicate) and other.child.narrows(self.child))
+
+    def key(self):
+        return (self.child,)
+
+class ComparePredicate(FilterPredicate):
+    __slots__ = ('operator', 'operand', 'compare')
+
+    # The math operators a filter box understands, and the function that does the comparison.
+    operators = {'==': operator.eq, '>=': operator.ge, '<=': operator.le, '>': operator.gt, '<': operator.lt}
+
+    def __init__(self, operator_text, operand):
+        object.__setattr__(self, 'operator', operator_text)
+        object.__setattr__(self, 'operand', float(operand))
+        object.__setattr__(self, 'compare', self.operators[operator_text])
+
+    def matches(self, value):
+        try:
+            column_number = float(value)
+        except:
+            # The column value isn't a number, so the math can't match.
+            return False
+        return self.compare(column_number, self.operand)
+
+    def vectorizable(self):
+        return np is not None
+
+    def numericRange(self):
+        # A NaN operand never matches anything, and can't be looked up in a sorted list.
+        if self.operand != self.operand:
+            return None
+        infinity = float('inf')
+        if self.operator == '==':
+            return (self.operand, True, self.operand, True)
+        if self.operator[0] == '>':
+            return (self.operand, self.operator == '>=', infinity, True)
+        return (-infinity, True, self.operand, self.operator == '<=')
+
+    def evaluateArray(self, numbers):
+        # NaN (not a number) never compares true, same as a failed float() in matches()
+        return self.compare(numbers, self.operand)
+
+    def narrows(self, other):
+        if super().narrows(other):
+            return True
+        if not isinstance(other, ComparePredicate):
+            return False
+        # An exact value is narrower than any comparison that value passes.
+        if self.operator == '==':
+            return other.compare(self.operand, other.operand)
+        # Otherwise both sides have to be bounds in the same direction, and this one has to be tighter.
+        if self.operator[0] != other.operator[0] or other.operator == '==':
+            return False
+        if self.operand == other.operand:
+            return self.operator == other.operator or other.operator.endswith('=')
+        if self.operator[0] == '>':
+            return self.operand > other.operand
+        return self.operand < other.operand
+
+    def key(self):
+        return (self.operator, self.operand)
+
+class RegexPredicate(FilterPredicate):
+    __slots__ = ('pattern', 'anchored', 'literal', 'fragments')
+
+    # Characters that mean something special in a regex.
+    special_characters = set('.^$*+?{}[]\\|()')
+
+    def __init__(self, regex):
+        object.__setattr__(self, 'pattern', re.compile(regex))
+        # If the regex is just plain text (optionally starting with a ^), keep the text around so
+        #   I can tell when a new filter is the old one with more typed on the end.
+        anchored = regex.startswith('^')
+        object.__setattr__(self, 'anchored', anchored)
+        object.__setattr__(self, 'literal', self.literalText(regex[1:] if anchored else regex))
+        # Pieces of plain text that anything this regex matches has to contain.  Used with the trigram index.
+        object.__setattr__(self, 'fragments', tuple(fragment for fragment in self.requiredText(regex) if len(fragment) >= 3))
+
+    # Returns the plain text a regex matches if it doesn't use any special characters (escaped
+    #   punctuation like \[ counts as plain text), otherwise returns None.
+    @classmethod
+    def literalText(cls, regex):
+        literal = []
+        escaped = False
+        for character in regex:
+            if escaped:
+                if character.isalnum():
+                    return None
+                literal.append(character)
+                escaped = False
+            elif character == '\\':
+                escaped = True
+            elif character in cls.special_characters:
+                return None
+            else:
+                literal.append(character)
+        if escaped:
+            return None
+        return ''.join(literal)
+
+    # Returns the runs of plain text a regex can't match without.  It errs on the side of returning less: anything
+    #   optional, repeated, grouped or in a character class just ends the current run, and a regex with an |
+    #   or inline flags in it gets nothing at all.
+    @classmethod
+    def requiredText(cls, regex):
+        if '|' in regex or '(?' in regex:
+            return []
+        fragments = []
+        current = []
+        position = 0
+        while position < len(regex):
+            character = regex[position]
+            if character == '\\':
+                escaped = regex[position + 1:position + 2]
+                if escaped and (escaped in 'xuUN' or escaped.isdigit()):
+                    # \x41, \u0041, \N{...}, octal and backreferences carry more characters than the two here,
+                    #   and they'd end up looking like plain text.  Not worth working out, so nothing's required.
+                    return []
+                if escaped and not escaped.isalnum():
+                    current.append(escaped)
+                else:
+                    # Something like \d or \b.  Not plain text.
+                    fragments.append(''.join(current))
+                    current = []
+                position += 2
+                continue
+            if character in '*?{':
+                # The character before this might not be there at all
+                if current:
+                    current.pop()
+                fragments.append(''.join(current))
+                current = []
+                if character == '{':
+                    position = regex.find('}', position)
+                    if position < 0:
+                        break
+            elif character == '+':
+                # The character before has to be there, but what comes after isn't right next to it.
+                fragments.append(''.join(current))
+                current = []
+            elif character == '[':
+                # Skip over the whole character class
+                fragments.append(''.join(current))
+                current = []
+                position = cls.classEnd(regex, position)
+            elif character == '(':
+                # Skip over the whole group, it might be optional
+                fragments.append(''.join(current))
+                current = []
+                depth = 0
+                while position < len(regex):
+                    if regex[position] == '\\':
+                        position += 1
+                    elif regex[position] == '[':
+                        position = cls.classEnd(regex, position)
+                    elif regex[position] == '(':
+                        depth += 1
+                    elif regex[position] == ')':
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    position += 1
+            elif character in cls.special_characters:
+                fragments.append(''.join(current))
+                current = []
+            else:
+                current.append(character)
+            position += 1
+        fragments.append(''.join(current))
+        return [fragment for fragment in fragments if fragment]
+
+    # Returns the position of the ] that closes the character class starting at 'start'.
+    @staticmethod
+    def classEnd(regex, start):
+        position = start + 1
+        if regex[position:position + 1] == '^':
+            position += 1
+        # A ] right at the start of a class is just a character in the class
+        if regex[position:position + 1] == ']':
+            position += 1
+        while position < len(regex):
+            if regex[position] == '\\':
+                position += 1
+            elif regex[position] == ']':
+                return position
+            position += 1
+        return position
+
+    def matches(self, value):
+        return self.pattern.search(str(value)) is not None
+
+    def estimatedCost(self, values):
+        cost = super().estimatedCost(values)
+        # The trigram index only leaves a few rows for the regex to look at, once it's been built.
+        if cost == self.scanCost() and self.fragments and isinstance(values, ColumnData) and values.trigram_index is not None:
+            return cost / 10
+        return cost
+
+    def indexCandidates(self, values):
+        if self.fragments and isinstance(values, ColumnData):
+            return values.trigramCandidates(self.fragments, build=False)
+        return None
+
+    def scanCost(self):
+        # Plain text is a quick substring search, a real regex is a lot more work.
+        return 2.0 if self.literal is not None else 5.0
+
+    def evaluateColumn(self, values, candidates=None):
+        mask = self.evaluateIndexed(values, candidates)
+        if mask is not None:
+            return mask
+        # Let the trigram index rule out most of the rows before running the regex.  Only scans of the whole
+        #   column count towards building it, a filter narrowing an older one only looks at a few rows.
+        if self.fragments and isinstance(values, ColumnData):
+            index_candidates = values.trigramCandidates(self.fragments, build=candidates is None)
+            if index_candidates is not None:
+                candidates = maskAnd(candidates, index_candidates)
+        return self.evaluateRows(values, candidates)
+
+    def narrows(self, other):
+        if super().narrows(other):
+            return True
+        if not isinstance(other, RegexPredicate) or self.literal is None or other.literal is None:
+            return False
+        # "^abc" only matches things that start with "^ab".  Anything containing "xabcx" contains "abc".
+        if other.anchored:
+            return self.anchored and self.literal.startswith(other.literal)
+        return other.literal in self.literal
+
+    def key(self):
+        return (self.pattern.pattern,)
+
+# A filter that always gives the same answer.  For example a math filter with a value that isn't a number
+#   never matches anything.
+class ConstantPredicate(FilterPredicate):
+    __slots__ = ('result',)
+
+    def __init__(self, result):
+        object.__setattr__(self, 'result', bool(result))
+
+    def matches(self, value):
+        return self.result
+
+    def estimatedCost(self, values):
+        return 0.0
+
+    def vectorizable(self):
+        return np is not None
+
+    def evaluateArray(self, numbers):
+        return np.full(len(numbers), self.result)
+
+    def narrows(self, other):
+        # Matching nothing is narrower than anything.
+        return (self.result is False) or super().narrows(other)
+
+    def key(self):
+        return (self.result,)
+
+# These two functions run inside the worker processes of a ProcessFilterEngine.  Each process gets a copy of
+#   the column data once when it starts, so a filter only has to send over the predicate and a row range.
+filter_process_columns = None
+
+def initializeFilterProcess(columns):
+    global filter_process_columns
+    filter_process_columns = columns
+
+def filterProcessChunk(column, predicate, start, stop, candidates):
+    return bytes(predicate.evaluateColumn(filter_process_columns[column][start:stop], candidates))
+
+# Spreads filter evaluation over a pool of processes, so a slow regex can use every core instead of
+#   just the one the GIL allows.  The pool gets a snapshot of the table's columns when it's created, and is
+#   rebuilt when the data changes.
+class ProcessFilterEngine():
+    # Don't bother splitting the rows up any smaller than this.  Sending work to a process isn't free.
+    minimum_chunk_size = 10000
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pool = None
+        self.model = None
+        self.data_version = None
+        self.row_count = 0
+
+    # Makes sure the worker processes have the current data from the model.  Call this from the GUI
+    #   thread before evaluating anything.
+    def prepare(self, model):
+        if self.pool is not None and self.model is model and self.data_version == model.data_version:
+            return
+        self.shutdown()
+        columns = [model.columnValues(column) for column in range(model.columnCount())]
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=initializeFilterProcess, initargs=(columns,))
+        self.model = model
+        self.data_version = model.data_version
+        self.row_count = len(model.original_data)
+
+    # Returns the bitmap of the rows between start and stop that match the predicate.  Candidates works
+    #   the same as FilterPredicate.evaluateColumn, and covers just the rows between start and stop.
+    def evaluate(self, column, predicate, candidates=None, start=0, stop=None):
+        if stop is None:
+            stop = self.row_count
+        chunk_size = max(self.minimum_chunk_size, -(-(stop - start) // (self.max_workers * 4)))
+        futures = []
+        for chunk_start in range(start, stop, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, stop)
+            chunk_candidates = None if candidates is None else bytes(candidates[chunk_start - start:chunk_stop - start])
+            futures.append((chunk_start, chunk_stop, self.pool.submit(filterProcessChunk, column, predicate, chunk_start, chunk_stop, chunk_candidates)))
+
+        # Put the pieces back together in the original row order.
+        mask = bytearray(stop - start)
+        for chunk_start, chunk_stop, future in futures:
+            mask[chunk_start - start:chunk_stop - start] = future.result()
+        return mask
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+# A least recently used cache of filter results, so switching back to a recent filter is instant.  Entries are
+#   keyed on the column, the (normalized) predicate and the column's version, so a cell changing in a column
+#   makes its old results unreachable, and they get dropped the next time that column is looked up.
+#   The bitmaps are stored compactly: a list of row numbers if only a few rows matched, otherwise packed bits.
+#   Each result is stored with its domain, the bitmap of rows it was worked out for (None for all of them).
+class FilterResultCache():
+    def __init__(self, memory_budget=64 * 1024 * 1024):
+        # The most bytes the stored results are allowed to take up.  The oldest ones get thrown out past this.
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        # (column, predicate, version) -> (mask entry, domain entry, size in bytes), oldest first.  The entries
+        #   are what compact() returns.
+        self.entries = OrderedDict()
+        # The version each column's entries are for.
+        self.column_versions = {}
+        self.hits = 0
+        self.misses = 0
+
+    # Returns (bitmap, domain) for a filter if it's in the cache, otherwise None.
+    def get(self, column, predicate, version):
+        self.invalidateOldVersions(column, version)
+        key = (column, predicate.normalized(), version)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        mask_entry, domain_entry, size = entry
+        return (self.expand(mask_entry), None if domain_entry is None else self.expand(domain_entry))
+
+    def put(self, column, predicate, version, mask, domain=None):
+        self.invalidateOldVersions(column, version)
+        key = (column, predicate.normalized(), version)
+        # A result that's already stored might be for fewer rows, so it gets replaced.
+        old_entry = self.entries.pop(key, None)
+        if old_entry is not None:
+            self.memory_used -= old_entry[2]
+        mask_entry = self.compact(mask)
+        domain_entry = None if domain is None else self.compact(domain)
+        size = mask_entry[3] + (0 if domain_entry is None else domain_entry[3])
+        # Don't bother with anything that could never fit.
+        if size > self.memory_budget:
+            return
+        self.entries[key] = (mask_entry, domain_entry, size)
+        self.memory_used += size
+        self.evict()
+
+    def setMemoryBudget(self, memory_budget):
+        self.memory_budget = memory_budget
+        self.evict()
+
+    # Throws out the least recently used results until everything fits in the budget.
+    def evict(self):
+        while self.memory_used > self.memory_budget and self.entries:
+            key, entry = self.entries.popitem(last=False)
+            self.memory_used -= entry[2]
+
+    # Drops everything stored for a column that isn't for the given version of it.
+    def invalidateOldVersions(self, column, version):
+        if self.column_versions.get(column) == version:
+            return
+        self.column_versions[column] = version
+        for key in [key for key in self.entries if key[0] == column and key[2] != version]:
+            self.memory_used -= self.entries.pop(key)[2]
+
+    def clear(self):
+        self.entries.clear()
+        self.column_versions.clear()
+        self.memory_used = 0
+
+    @staticmethod
+    def compact(mask):
+        row_count = len(mask)
+        matched = mask.count(1)
+        # A row number takes 4 bytes and a packed bit takes 1/8th of one, so under 1 in 32 rows matching the
+        #   list of row numbers is smaller.
+        if matched * 32 < row_count:
+            if np is not None:
+                rows = np.flatnonzero(np.frombuffer(mask, dtype=np.uint8)).astype(np.uint32)
+                return ('rows', rows, row_count, rows.nbytes)
+            rows = array('I', compress(range(row_count), mask))
+            return ('rows', rows, row_count, rows.itemsize * len(rows))
+        if np is not None:
+            bits = np.packbits(np.frombuffer(mask, dtype=np.uint8))
+            return ('bits', bits, row_count, bits.nbytes)
+        # Without numpy, zlib squeezes the 0/1 bytes down about as well.
+        packed = zlib.compress(mask, 1)
+        return ('zlib', packed, row_count, len(packed))
+
+    @staticmethod
+    def expand(entry):
+        kind, data, row_count, size = entry
+        if kind == 'rows':
+            if np is not None and isinstance(data, np.ndarray):
+                mask = np.zeros(row_count, dtype=np.uint8)
+                mask[data] = 1
+                return bytearray(mask.tobytes())
+            mask = bytearray(row_count)
+            for row in data:
+                mask[row] = 1
+            return mask
+        if kind == 'bits':
+            return bytearray(np.unpackbits(data, count=row_count).tobytes())
+        return bytearray(zlib.decompress(data))
+
+# One column's part of a filter plan (see SmartFilterProxy.filterPlan).  A column's bitmap only has to be right
+#   for the rows the columns before it in the plan let through, so each bitmap is kept along with its domain:
+#   the rows it was actually worked out for (None for all of them).  A step has everything it needs to work out
+#   its column for any set of rows, so it can be run on the GUI thread or handed to a FilterWorker.
+class FilterStep():
+    __slots__ = ('column', 'predicate', 'version', 'values', 'mask', 'domain', 'possible', 'cost', 'selectivity', 'index_mask')
+
+    # Anything that costs this much per row or more is done one row at a time in python (or has an index to
+    #   build first), and is worth handing to a background thread.
+    slow_cost = 0.1
+
+    def __init__(self, column, predicate, version, values, mask=None, domain=None, possible=None):
+        self.column = column
+        self.predicate = predicate
+        self.version = version
+        self.values = values
+        # The bitmap and domain from an earlier run of this same predicate, if there was one.
+        self.mask = mask
+        self.domain = domain
+        # If the predicate narrows an older one, a bitmap of the only rows that can match.
+        self.possible = possible
+        # The predicate's indexCandidates for the whole column, worked out the first time part of it gets evaluated.
+        self.index_mask = None
+        self.cost, self.selectivity = self.estimate()
+
+    # Returns (cost per row, fraction of rows expected to match)
+    def estimate(self):
+        if self.mask is not None and self.domain is None:
+            # Already worked out for every row, it just has to be ANDed in.
+            return 0.0, self.mask.count(1) / max(len(self.mask), 1)
+        cost = self.predicate.estimatedCost(self.values)
+        if self.mask is not None:
+            return cost, self.mask.count(1) / max(self.domain.count(1), 1)
+        return cost, self.predicate.sampleSelectivity(self.values)
+
+    # The order steps should run in, lowest first.  Cheap steps that throw out a lot of rows go first, because
+    #   every row they throw out is one the expensive steps don't have to look at.
+    def rank(self):
+        return (self.cost / max(1.0 - self.selectivity, 0.001), self.selectivity)
+
+    def slow(self):
+        return self.cost >= self.slow_cost
+
+    # Works out this step's bitmap for the rows set in 'running' (None for all of them), limited to the rows
+    #   between start and stop.  Returns (bitmap, domain), both covering just start to stop.  If 'rows' is
+    #   given, it's a list of row numbers to do instead of start to stop, and everything covers those.
+    def run(self, running, start=0, stop=None, engine=None, rows=None):
+        if stop is None:
+            stop = len(self.values)
+        if self.mask is not None:
+            mask = self.bitmapPart(self.mask, start, stop, rows)
+            if self.domain is None:
+                return mask, None
+            domain = self.bitmapPart(self.domain, start, stop, rows)
+            # Only the running rows the old bitmap doesn't cover need looking at.
+            needed = maskNot(domain, running)
+            if needed.find(1) < 0:
+                return mask, domain
+            return maskOr(mask, self.evaluate(needed, start, stop, engine, rows)), maskOr(domain, running)
+        possible = None if self.possible is None else self.bitmapPart(self.possible, start, stop, rows)
+        # If most of the rows need looking at anyway, look at all of them.  Then the bitmap is good for
+        #   every row, and doesn't need topping up when a filter before it changes.
+        if running is None or running.count(1) * 2 > len(running):
+            return self.evaluate(possible, start, stop, engine, rows), None
+        return self.evaluate(maskAnd(running, possible), start, stop, engine, rows), running
+
+    def evaluate(self, candidates, start, stop, engine=None, rows=None):
+        whole_column = rows is None and start == 0 and stop == len(self.values)
+        if engine is not None or not whole_column:
+            # Neither a slice of the column nor another process can use the column's indexes, so rule out the
+            #   rows they can here first.
+            index_mask = self.indexCandidates()
+            if index_mask is not None:
+                candidates = maskAnd(candidates, self.bitmapPart(index_mask, start, stop, rows))
+        if rows is not None:
+            return self.predicate.evaluateColumn(list(map(self.values.__getitem__, rows)), candidates)
+        # numpy is quicker than sending the work to other processes
+        if engine is not None and not self.predicate.vectorizable():
+            return engine.evaluate(self.column, self.predicate, candidates, start, stop)
+        if whole_column:
+            return self.predicate.evaluateColumn(self.values, candidates)
+        return self.predicate.evaluateColumn(self.values[start:stop], candidates)
+
+    def indexCandidates(self):
+        if self.index_mask is None:
+            self.index_mask = self.predicate.indexCandidates(self.values) or False
+        return self.index_mask or None
+
+    # Returns the part of a bitmap for the rows between start and stop, or for the row numbers in 'rows'.
+    @staticmethod
+    def bitmapPart(bitmap, start, stop, rows=None):
+        if rows is not None:
+            return bytearray(map(bitmap.__getitem__, rows))
+        if start == 0 and stop == len(bitmap):
+            return bitmap
+        return bitmap[start:stop]
+
+    def __repr__(self):
+        return f"FilterStep(column={self.column}, predicate={self.predicate!r}, cost={self.cost:.3g}, selectivity={self.selectivity:.3g})"
+
+# Runs a list of FilterSteps over the table a chunk of rows at a time, building up their bitmaps as it goes.
+#   chunks() is a generator, so the scan can be stopped after any chunk and picked up again later from
+#   the same spot.  The background FilterWorker runs one to the end, and lazy filtering only runs one as
+#   far as the table needs rows.  If an order is given (a sorted permutation of the row numbers) the rows
+#   are scanned, and come out, in that order.
+class FilterScan():
+    chunk_size = 20000
+
+    def __init__(self, steps, fixed_mask, row_count, engine=None, order=None):
+        # The FilterSteps to work out, in order
+        self.steps = steps
+        # The bitmap of the rows the steps already done let through.  A row has to match these too.
+        self.fixed_mask = fixed_mask
+        self.row_count = row_count
+        # If there's a ProcessFilterEngine, each chunk of a slow step gets handed to it.
+        self.engine = engine
+        self.order = order
+        self.masks = {step.column: bytearray(row_count) for step in steps}
+        self.domains = {step.column: bytearray(row_count) for step in steps}
+        # Every row (or position in the order) before this one has been scanned.
+        self.position = 0
+
+    # Scans the next chunk of rows each time it's asked, and yields the row numbers in it that matched.
+    def chunks(self):
+        while self.position < self.row_count:
+            start = self.position
+            stop = min(start + self.chunk_size, self.row_count)
+            rows = None if self.order is None else self.order[start:stop].tolist()
+            chunk_mask = None if self.fixed_mask is None else FilterStep.bitmapPart(self.fixed_mask, start, stop, rows)
+            for step in self.steps:
+                # Only the slow steps are worth sending to the processes, the rest have an index to use here.
+                engine = self.engine if step.slow() else None
+                column_mask, column_domain = step.run(chunk_mask, start, stop, engine, rows)
+                if column_domain is None:
+                    column_domain = bytes([1]) * (stop - start)
+                if rows is None:
+                    self.masks[step.column][start:stop] = column_mask
+                    self.domains[step.column][start:stop] = column_domain
+                else:
+                    self.scatter(self.masks[step.column], rows, column_mask)
+                    self.scatter(self.domains[step.column], rows, column_domain)
+                chunk_mask = maskAnd(chunk_mask, column_mask)
+            self.position = stop
+            if rows is None:
+                rows = range(start, stop)
+            yield list(rows) if chunk_mask is None else list(compress(rows, chunk_mask))
+
+    # Copies a chunk's bitmap back into a whole column's bitmap, at the rows it came from.
+    @staticmethod
+    def scatter(bitmap, rows, chunk_bitmap):
+        if np is not None:
+            np.frombuffer(bitmap, dtype=np.uint8)[rows] = np.frombuffer(chunk_bitmap, dtype=np.uint8)
+            return
+        for row, bit in zip(rows, chunk_bitmap):
+            bitmap[row] = bit
+
+    def finished(self):
+        return self.position >= self.row_count
+
+    # Returns column -> (bitmap, domain) for what's been scanned so far.  The rows that haven't been scanned
+    #   yet are left out of the domains.
+    def results(self):
+        # A domain with every row in it is just None
+        return {pos: (self.masks[pos], None if self.domains[pos].find(0) < 0 else self.domains[pos]) for pos in self.masks}
+
+# QRunnable can't have signals of its own, so the background filter worker sends them through this.
+class FilterWorkerSignals(QObject):
+    # (generation, list of the row numbers in original_data that matched, in order)
+    rowsMatched = pyqtSignal(int, object)
+    # (generation, dict of column -> (bitmap, domain))
+    finished = pyqtSignal(int, object)
+
+# Scans the filters over the data on a thread in the QThreadPool, a chunk of rows at a time.  After every
+#   chunk it sends the rows that matched, so the table can start showing results before the scan is done.
+class FilterWorker(QRunnable):
+    def __init__(self, generation, scan):
+        super().__init__()
+        self.signals = FilterWorkerSignals()
+        self.generation = generation
+        # The FilterScan to run.  If it has a ProcessFilterEngine, each chunk gets handed to that instead of
+        #   being done on this thread.
+        self.scan = scan
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            for rows in self.scan.chunks():
+                # Stop as soon as possible if a new filter has been started.
+                if self.cancelled:
+                    return
+                self.signals.rowsMatched.emit(self.generation, rows)
+        except CancelledError:
+            # The engine's pool got replaced because the data changed.  A new filter will be along.
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.generation, self.scan.results())
+
+class SortWorkerSignals(QObject):
+    # (generation, [(column, column version, column type, (permutation, nan count, ranks)), ...])
+    finished = pyqtSignal(int, object)
+
+# Does the full sort of some columns on a thread from the QThreadPool, for a background sort or while a partial
+#   sort shows the first pages.  numpy lets go of the GIL while it sorts, so the GUI carries on as normal.
+#   'jobs' is a list of (column, column version, column type, values, keys), with keys None to work them
+#   out from the values here.  Setting cancelled stops it before the next column.
+class SortWorker(QRunnable):
+    def __init__(self, generation, jobs):
+        super().__init__()
+        self.signals = SortWorkerSignals()
+        self.generation = generation
+        self.jobs = jobs
+        self.cancelled = False
+
+    def run(self):
+        results = []
+        for column, version, column_type, values, keys in self.jobs:
+            if self.cancelled:
+                break
+            if keys is None:
+                keys = SmartFilterProxy.valuesSortKeys(values, column_type)
+            results.append((column, version, column_type, SmartFilterProxy.buildSortPermutation(keys)))
+        self.signals.finished.emit(self.generation, results)
+
 # I'm only really using the QSortFilterProxyModel for their sort function.  I do my own thing for filtering, but I store all 
 #   of that in this class anyway.
 class SmartFilterProxy(QSortFilterProxyModel):
@@ -108,51 +1322,498 @@ class SmartFilterProxy(QSortFilterProxyModel):
         self.is_and = re.compile("^.+\&\&")
         self.is_or = re.compile("^.+\|\|")
         self.is_not = re.compile("^!(.+)")
+
+        # The filters (by column) that produced each column's bitmap below, and the version of the column
+        #   (see SmartTableModel.column_versions) they were run against.
+        self.applied_filters = {}
+        self.mask_versions = {}
+
+        # Recent filter results, so going back to a filter doesn't mean running it again.
+        self.filter_cache = FilterResultCache()
+
+        # One bitmap per filtered column (a bytearray with a 1 for each row in original_data that matches
+        #   that column's filter), and all of them ANDed together.  A column's bitmap is only right for the rows
+        #   in its domain (None means all of them), see FilterStep.
+        self.column_masks = {}
+        self.mask_domains = {}
+        self.filter_mask = None
+
+        # The FilterSteps from the last time the filters were run, in the order they ran.  See explainFilters.
+        self.filter_plan = []
+
+        # column -> (column version, column type, permutation, nan count, ranks).  See sortPermutation.
+        self.sort_permutations = {}
+        # A tuple of the (column, descending) keys the table is sorted by, main one first, or None.  The rows
+        #   showing are always filter_mask walked in this order (see showFilteredRows), so filtering doesn't
+        #   lose the sort.
+        self.sort_order = None
+        # (sort order, column versions, permutation) for the last sort on more than one column.
+        self.composite_permutation = None
+
+        # Set this to show the first page of a big sort before the whole thing is sorted (see
+        #   SmartTable.enablePartialSorting).  partial_sort is the generator handing out the pages, and
+        #   partial_sort_count how many rows it has in total.
+        self.partial_sorting = False
+        self.partial_sort_minimum_rows = 200000
+        self.partial_sort = None
+        self.partial_sort_count = 0
+        self.sort_worker = None
+        self.sort_generation = 0
+
+        # Set this to sort columns that haven't been sorted before on another thread, leaving the rows as they
+        #   are until it's done (see SmartTable.enableBackgroundSorting).  sort_request is the sort order it's
+        #   working on.
+        self.background_sorting = False
+        self.sort_request = None
+
+        # Set this to run the filter scans on a background thread (see SmartTable.enableBackgroundFiltering).
+        self.background_filtering = False
+        self.filter_worker = None
+        self.filter_generation = 0
+        self.pending_filters = None
+        # The sort order the background filter is scanning in.
+        self.pending_sort_order = None
+
+        # A ProcessFilterEngine to do the evaluation on (see SmartTable.enableMultiProcessFiltering).
+        self.filter_engine = None
+
+        # How long (in seconds) the last few filters took, by the column of the box that set them off.  The
+        #   delay before a filter box fires is worked out from these, see filterDelayInterval.
+        self.filter_timings = defaultdict(lambda: deque(maxlen=5))
+        # The delay is debounce_factor times a typical filter time, kept between the minimum and maximum.
+        self.debounce_minimum = 0.05
+        self.debounce_maximum = 1.5
+        self.debounce_factor = 2.0
+        # A guess at how long filtering takes per row, for before anything has been timed.
+        self.debounce_row_estimate = 1e-6
+        # (column, start time) of the filter the background worker is running, so it can be timed.
+        self.filter_started = None
+
+        # Set this to only filter as far down the table as it's showing (see SmartTable.enableLazyFiltering).
+        #   lazy_scan is the FilterScan that's part way through, and lazy_completion finishes it off a bit at
+        #   a time when the GUI isn't busy.
+        self.lazy_filtering = False
+        self.lazy_completion = False
+        self.lazy_scan = None
+        self.lazy_timer = QTimer()
+        self.lazy_timer.setInterval(0)
+        self.lazy_timer.timeout.connect(self.lazyScanTimeout)
  
 
-    def custom_sort(self, item1, item2, sort_column):
-        value1 = item1[sort_column]
-        value2 = item2[sort_column]
+    # Works out a sort key for every value in a column, so the sort itself is just comparing keys.  A column of
+    #   numbers gets the floats as its keys.  Anything else gets (rank, value) tuples: numbers first, then
+    #   text, then NaN, which always goes at the end no matter which way the column is sorted.  A column_type
+    #   of 'text' sorts everything as text, even things that look like numbers.
+    @staticmethod
+    def sortKeys(values, column_type=None, descending=False):
+        if column_type == 'text':
+            return list(map(str, values))
         try:
-            float1 = float(value1)
-            float2 = float(value2)
-            return float1-float2
-        except:
-            return value1<value2
+            keys = list(map(float, values))
+        except (TypeError, ValueError, OverflowError):
+            pass
+        else:
+            # NaN doesn't compare as bigger or smaller than anything, so it would scramble the sort.
+            if all(key == key for key in keys):
+                return keys
+        nan_rank = -1 if descending else 2
+        keys = []
+        for value in values:
+            try:
+                number = float(value)
+            except OverflowError:
+                # An int too big for a float still compares fine with floats, so it sorts with the numbers.
+                keys.append((0, value))
+                continue
+            except (TypeError, ValueError):
+                keys.append((1, str(value)))
+                continue
+            keys.append((0, number) if number == number else (nan_rank, 0.0))
+        return keys
+
+    # Returns (permutation, nan count, ranks) for a column.  The permutation is the row numbers of original_data
+    #   in ascending order of the column, with nan count NaNs at the end of it.  ranks gives each row's place
+    #   in that order, with rows that have the same value sharing a rank, which is what multi-column sorts use.
+    #   It's all kept until a cell in the column changes, so going back to a column that was sorted before
+    #   doesn't have to compare anything.
+    def sortPermutation(self, column):
+        parent_table_model = self.sourceModel()
+        version = parent_table_model.column_versions[column]
+        column_type = parent_table_model.column_types[column]
+        cached = self.sort_permutations.get(column)
+        if cached is not None and cached[0] == version and cached[1] == column_type:
+            return cached[2:]
+        result = self.buildSortPermutation(self.columnSortKeys(column))
+        self.sort_permutations[column] = (version, column_type) + result
+        return result
+
+    # True if sortPermutation already has the column worked out.
+    def sortPermutationCached(self, column):
+        parent_table_model = self.sourceModel()
+        cached = self.sort_permutations.get(column)
+        return (cached is not None and cached[0] == parent_table_model.column_versions[column]
+                and cached[1] == parent_table_model.column_types[column])
 
-    def key_func(self, sort_column):
-        return functools.cmp_to_key(lambda item1, item2: self.custom_sort(item1, item2, sort_column))
+    # Returns the sort keys for every row of a column (see sortKeys).
+    def columnSortKeys(self, column):
+        parent_table_model = self.sourceModel()
+        return self.valuesSortKeys(parent_table_model.columnValues(column), parent_table_model.column_types[column])
+
+    # Does the work for columnSortKeys, it can run on another thread too.  If the column already has its numbers
+    #   in a numpy array with nothing missing, that gets used as the keys instead of converting every value again.
+    @staticmethod
+    def valuesSortKeys(values, column_type=None):
+        if np is not None and column_type != 'text' and isinstance(values, ColumnData):
+            if values.numeric_array is not None or isinstance(values, NumericColumn):
+                numbers = values.numericArray()
+                if not np.isnan(numbers).any():
+                    return numbers
+        keys = SmartFilterProxy.sortKeys(values, column_type)
+        if np is not None and keys and type(keys[0]) is float:
+            return np.array(keys, dtype=np.float64)
+        return keys
+
+    # Does the work for sortPermutation.  Doesn't touch the model, so it can run on another thread.
+    @staticmethod
+    def buildSortPermutation(keys):
+        if np is not None and isinstance(keys, np.ndarray):
+            permutation = np.argsort(keys, kind='stable')
+            # A new rank starts everywhere the sorted value changes.
+            sorted_keys = keys[permutation]
+            new_value = np.zeros(len(keys), dtype=np.int64)
+            new_value[1:] = sorted_keys[1:] != sorted_keys[:-1]
+            ranks = np.empty(len(keys), dtype=np.int64)
+            ranks[permutation] = np.cumsum(new_value)
+            return permutation, 0, ranks
+        permutation = sorted(range(len(keys)), key=keys.__getitem__)
+        # sortKeys ranks NaN as 2, and they all end up at the end.
+        nan_count = sum(1 for key in keys if type(key) is tuple and key[0] == 2)
+        ranks = [0] * len(keys)
+        rank = -1
+        previous_key = None
+        for row in permutation:
+            if rank < 0 or keys[row] != previous_key:
+                rank += 1
+                previous_key = keys[row]
+            ranks[row] = rank
+        if np is None:
+            return array('q', permutation), nan_count, array('q', ranks)
+        return np.array(permutation, dtype=np.int64), nan_count, np.array(ranks, dtype=np.int64)
+
+    # Returns all the row numbers of original_data in the order of a column, as a numpy array (or an array
+    #   without numpy).  Descending just walks the ascending permutation backwards, NaNs excepted, they
+    #   always go at the end.
+    def sortedPermutation(self, column, descending=False):
+        permutation, nan_count, ranks = self.sortPermutation(column)
+        if not descending:
+            return permutation
+        numbered = len(permutation) - nan_count
+        backwards = permutation[:numbered][::-1]
+        if nan_count:
+            backwards = np.concatenate((backwards, permutation[numbered:])) if np is not None else backwards + permutation[numbered:]
+        return backwards
+
+    # Returns each row's rank in a column (see sortPermutation), flipped around for a descending sort.  NaNs
+    #   keep the last rank either way.
+    def sortRanks(self, column, descending=False):
+        permutation, nan_count, ranks = self.sortPermutation(column)
+        if not descending or len(permutation) == 0:
+            return ranks
+        numbered = len(permutation) - nan_count
+        # The rank the NaNs have, which is one past the last number's rank.
+        nan_rank = ranks[permutation[numbered - 1]] + 1 if numbered else 0
+        if np is not None:
+            flipped = (nan_rank - 1) - ranks
+            if nan_count:
+                flipped[ranks == nan_rank] = nan_rank
+            return flipped
+        return array('q', (rank if rank == nan_rank else nan_rank - 1 - rank for rank in ranks))
+
+    # Returns all the row numbers of original_data in the order of the current sort.  A sort on more than one
+    #   column combines each column's cached ranks into one key, and sorts once on that.
+    def orderPermutation(self):
+        if len(self.sort_order) == 1:
+            return self.sortedPermutation(*self.sort_order[0])
+        parent_table_model = self.sourceModel()
+        versions = [(parent_table_model.column_versions[column], parent_table_model.column_types[column]) for column, descending in self.sort_order]
+        if self.composite_permutation is not None and self.composite_permutation[:2] == (self.sort_order, versions):
+            return self.composite_permutation[2]
+
+        ranks = [self.sortRanks(column, descending) for column, descending in self.sort_order]
+        if np is not None:
+            # lexsort uses the last key as the main one, and keeps ties in row order.
+            permutation = np.lexsort(ranks[::-1])
+        else:
+            keys = list(zip(*ranks))
+            permutation = array('q', sorted(range(len(keys)), key=keys.__getitem__))
+        self.composite_permutation = (self.sort_order, versions, permutation)
+        return permutation
+
+    # Returns a list of the row numbers of original_data in the order of the current sort, only the ones set
+    #   in 'mask' (None for all of them).
+    def sortedRows(self, mask=None):
+        permutation = self.orderPermutation()
+        if mask is None:
+            return permutation.tolist()
+        if np is not None:
+            return permutation[np.frombuffer(mask, dtype=np.uint8)[permutation].view(bool)].tolist()
+        return list(compress(permutation, map(mask.__getitem__, permutation)))
+
+    # Rebuilds unpaged_data from the filter bitmap, in the sorted order if the table is sorted.  Just one pass
+    #   over the rows, the sort itself is cached.
+    def showFilteredRows(self):
+        parent_table_model = self.sourceModel()
+        self.stopPartialSort()
+        if self.sort_order is None:
+            parent_table_model.unpaged_data = parent_table_model.selectRows(self.filter_mask)
+        elif self.partialSortWanted(self.sort_order):
+            self.startPartialSort()
+        else:
+            parent_table_model.unpaged_data = parent_table_model.selectRows(rows=self.sortedRows(self.filter_mask))
+
+    # A partial sort is only worth it for a big table sorted by one column that hasn't been sorted before.
+    def partialSortWanted(self, sort_order):
+        return (self.partial_sorting is True and len(sort_order) == 1
+                and len(self.sourceModel().original_data) >= self.partial_sort_minimum_rows
+                and not self.sortPermutationCached(sort_order[0][0]))
+
+    # Shows the first page of a sort without sorting everything.  The page is picked out with a partial sort,
+    #   further pages get picked out the same way as the view asks for them (see SmartTableModel.fetchMore),
+    #   and meanwhile a SortWorker does the full sort.  When that's done it takes over.
+    def startPartialSort(self):
+        parent_table_model = self.sourceModel()
+        column, descending = self.sort_order[0]
+        keys = self.columnSortKeys(column)
+        row_count = len(parent_table_model.original_data)
+        if np is not None:
+            rows = np.arange(row_count) if self.filter_mask is None else np.flatnonzero(np.frombuffer(self.filter_mask, dtype=np.uint8))
+        else:
+            rows = list(range(row_count)) if self.filter_mask is None else list(compress(range(row_count), self.filter_mask))
+        self.partial_sort = self.partiallySortedRows(keys, rows, descending, parent_table_model.page_size)
+        self.partial_sort_count = len(rows)
+        parent_table_model.unpaged_data = parent_table_model.selectRows(rows=[])
+        parent_table_model.unscanned = self.partial_sort
+        parent_table_model.scanRows(parent_table_model.page_size)
+
+        self.sort_generation += 1
+        self.startSortWorker([(column, parent_table_model.column_versions[column], parent_table_model.column_types[column], None, keys)])
+
+    # Sorts columns on a thread from the QThreadPool (see SortWorker), 'jobs' being what SortWorker wants.
+    def startSortWorker(self, jobs):
+        worker = SortWorker(self.sort_generation, jobs)
+        worker.signals.finished.connect(self.sortWorkerFinished)
+        self.sort_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    # Works out the permutations a sort order needs in the background, and leaves the rows showing as they are
+    #   until it's done.  sortWorkerFinished then does the sort for real, which is quick with them cached.
+    def startBackgroundSort(self, sort_order, columns):
+        parent_table_model = self.sourceModel()
+        self.sort_request = sort_order
+        self.sort_generation += 1
+        # The values get picked up here, only the keys and the sorting are done on the other thread.
+        self.startSortWorker([(column, parent_table_model.column_versions[column], parent_table_model.column_types[column],
+                               parent_table_model.columnValues(column), None) for column in columns])
+        parent_table_model.sort_indicators = self.sortIndicators(sort_order, busy=True)
+        parent_table_model.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, parent_table_model.columnCount() - 1)
+        parent_table_model.smart_table.updateRowCountLabel()
+
+    # Forgets about a background sort that hasn't finished.  A column the worker is halfway through still gets
+    #   finished and cached, it just doesn't get shown.
+    def cancelSort(self):
+        if self.sort_request is None:
+            return
+        self.sort_request = None
+        self.sort_generation += 1
+        if self.sort_worker is not None:
+            self.sort_worker.cancelled = True
+            self.sort_worker = None
+
+    # Stops handing out pages from a partial sort.  A SortWorker that's still going keeps going, its
+    #   permutation still gets cached when it's done.
+    def stopPartialSort(self):
+        if self.partial_sort is None:
+            return
+        parent_table_model = self.sourceModel()
+        if parent_table_model.unscanned is self.partial_sort:
+            parent_table_model.unscanned = None
+        self.partial_sort = None
+        self.sort_generation += 1
 
-    
+    # Called (on the GUI thread) when a SortWorker has the full permutations for its columns.
+    def sortWorkerFinished(self, generation, results):
+        parent_table_model = self.sourceModel()
+        if self.sort_worker is not None and self.sort_worker.generation == generation:
+            self.sort_worker = None
+        for column, version, column_type, result in results:
+            # If the column changed while it was sorting, the result is no good.
+            if parent_table_model.column_versions[column] == version and parent_table_model.column_types[column] == column_type:
+                self.sort_permutations[column] = (version, column_type) + result
+        if generation != self.sort_generation:
+            return
+        if self.partial_sort is not None:
+            # The pages handed out so far are the start of the full order, so the rows showing don't move.
+            self.stopPartialSort()
+            parent_table_model.unpaged_data = parent_table_model.selectRows(rows=self.sortedRows(self.filter_mask))
+            if parent_table_model.virtual is True:
+                parent_table_model.updateView()
+            else:
+                parent_table_model._data = RowWindow(parent_table_model.unpaged_data, len(parent_table_model._data))
+                parent_table_model.smart_table.updateRowCountLabel()
+        elif self.sort_request is not None:
+            sort_order = self.sort_request
+            self.sort_request = None
+            self.setSortOrder(sort_order)
+
+    # A generator that gives the rows (a numpy array of row numbers, or a list) in sorted order a page at a
+    #   time, using keys from columnSortKeys.  Each page is picked out of what's left without sorting the
+    #   rest, and ties are broken the same way the full sort breaks them so the pages line up with it.
+    @staticmethod
+    def partiallySortedRows(keys, rows, descending, page_size):
+        page_size = max(page_size, 1)
+        if np is not None and isinstance(keys, np.ndarray):
+            # A descending sort walks the ascending one backwards, so ties go in reverse row order.
+            if descending:
+                rows = rows[::-1]
+                values = -keys[rows]
+            else:
+                values = keys[rows]
+            while len(rows):
+                if len(rows) <= page_size:
+                    yield rows[np.argsort(values, kind='stable')].tolist()
+                    return
+                # Everything smaller than the page_size'th value is in the page, plus as many rows that tie with
+                #   it as still fit, first ones first.
+                kth = np.partition(values, page_size - 1)[page_size - 1]
+                page = values < kth
+                page[np.flatnonzero(values == kth)[:page_size - int(page.sum())]] = True
+                yield rows[page][np.argsort(values[page], kind='stable')].tolist()
+                rows, values = rows[~page], values[~page]
+            return
+
+        # Without numpy, or keys that aren't all numbers, pick each page out with a heap.  The row number in the
+        #   key breaks ties.  NaNs always go at the end (in row order), so they're left out until everything else
+        #   is done.  The rows can still be a numpy array here, so make them a list first.
+        rows = rows.tolist() if np is not None and isinstance(rows, np.ndarray) else list(rows)
+        nan_key = (2, 0.0)
+        nan_rows = [row for row in rows if keys[row] == nan_key]
+        if nan_rows:
+            rows = [row for row in rows if keys[row] != nan_key]
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        while len(rows):
+            page = pick(page_size, rows, key=lambda row: (keys[row], row))
+            yield page
+            picked = set(page)
+            rows = [row for row in rows if row not in picked]
+        for start in range(0, len(nan_rows), page_size):
+            yield nan_rows[start:start + page_size]
+
+    # Called by the view when a header is clicked.  A plain click sorts by just that column.  A shift click adds
+    #   the column to the sort as the next key, or flips it if it's already one of the keys.
     def sort(self, column, order):
     #    # Get the data in the specified column from the source model
         source_column = self.mapToSource(self.index(0, column)).column()
-        data = self.sourceModel().unpaged_data
-
-        #data_sorted = sorted(data, key=lambda row: row[source_column])
-        data_sorted = sorted(data, key=self.key_func(source_column))
-        #print(data_sorted)
-
-    #    # Apply the sort order (ascending or descending)
-        if order == Qt.SortOrder.DescendingOrder:
-            data_sorted.reverse()
+        descending = (order == Qt.SortOrder.DescendingOrder)
+        if self.sort_order is not None and QApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier:
+            sort_order = list(self.sort_order)
+            columns = [sort_column for sort_column, sort_descending in sort_order]
+            if source_column in columns:
+                position = columns.index(source_column)
+                sort_order[position] = (source_column, not sort_order[position][1])
+            else:
+                sort_order.append((source_column, False))
+            self.setSortOrder(sort_order)
+        else:
+            self.setSortOrder([(source_column, descending)])
 
-        self.sourceModel().unpaged_data = data_sorted
-        self.sourceModel().updateView()
+    # Sorts the table by a list of (column, descending) keys, the first one being the main one.  An empty
+    #   list takes the sort off.
+    def setSortOrder(self, sort_order):
+        parent_table_model = self.sourceModel()
+        sort_order = tuple(sort_order) or None
+        # A new sort replaces one that's still going in the background.
+        self.cancelSort()
+        if (sort_order is not None and self.background_sorting is True and self.lazy_scan is None
+                and self.filter_worker is None and not self.partialSortWanted(sort_order)):
+            columns = [column for column, descending in sort_order if not self.sortPermutationCached(column)]
+            if columns:
+                self.startBackgroundSort(sort_order, columns)
+                return
+        self.sort_order = sort_order
+
+        parent_table_model.sort_indicators = self.sortIndicators(self.sort_order)
+        parent_table_model.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, parent_table_model.columnCount() - 1)
+
+        if self.lazy_scan is not None:
+            # Start the lazy filter over in the new order.  Whatever it worked out so far gets reused.
+            self.applyFilters()
+        elif self.filter_worker is None:
+            self.showFilteredRows()
+        elif self.sort_order is not None:
+            # A background filter is still adding rows, and filter_mask isn't done yet.  Sort what's there,
+            #   it gets put in order properly when the filter finishes.
+            self.sortLoadedRows(self.sort_order)
+        parent_table_model.updateView()
 
     #    # Notify the view that the data has changed
         self.layoutChanged.emit()
 
+    # Returns the text to put after the header of each sorted column.  With more than one key, the header text
+    #   says which is which (one arrow only fits one column).  'busy' marks the columns a background sort is on.
+    @staticmethod
+    def sortIndicators(sort_order, busy=False):
+        if sort_order is None:
+            return {}
+        if len(sort_order) > 1:
+            indicators = {column: f"{'▼' if descending else '▲'}{number}" for number, (column, descending) in enumerate(sort_order, 1)}
+        else:
+            indicators = {column: "" for column, descending in sort_order} if busy else {}
+        if busy:
+            indicators = {column: f"{indicator}⏳" for column, indicator in indicators.items()}
+        return indicators
+
+    # Sorts whatever rows are in unpaged_data right now by a list of (column, descending) keys.  It's one
+    #   stable sort per key, starting with the last one, which is fine for the few rows a background filter
+    #   has found so far.
+    def sortLoadedRows(self, sort_order):
+        parent_table_model = self.sourceModel()
+        for column, descending in reversed(sort_order):
+            data = parent_table_model.unpaged_data
+            if isinstance(data, ColumnarRows):
+                column_values = data.store.columns[column]
+                values = list(map(column_values.__getitem__, data.rowNumbers()))
+            else:
+                values = [row[column] for row in data]
+
+            # Work out each row's key once, then sort the positions by them.  reverse=True keeps rows with the
+            #   same value in the order they were in, same as an ascending sort.
+            keys = self.sortKeys(values, parent_table_model.column_types[column], descending)
+            if np is not None and keys and type(keys[0]) is float:
+                # All the keys are floats, so numpy can do it.  Negating them sorts descending and still keeps ties in order.
+                numbers = np.array(keys, dtype=np.float64)
+                positions = np.argsort(-numbers if descending else numbers, kind='stable').tolist()
+            else:
+                positions = sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+
+            if isinstance(data, ColumnarRows):
+                row_numbers = data.rowNumbers()
+                parent_table_model.unpaged_data = ColumnarRows(data.store, array('q', map(row_numbers.__getitem__, positions)))
+            else:
+                parent_table_model.unpaged_data = list(map(data.__getitem__, positions))
+
     def connectTextToFilter(self, table_header):
         # Store the table header
         self.table_header = table_header
 
-        for filter_box in table_header.filter_boxes:
+        for pos, filter_box in enumerate(table_header.filter_boxes):
             # Make a timer that will delay doing anything for a small amount of time so the user can type
-            #   their filter w/o it trying to update constantly
+            #   their filter w/o it trying to update constantly.  How long it waits depends on how long
+            #   filtering has been taking, see filterDelayInterval.
             filter_delay_timer = QTimer()
             filter_delay_timer.setSingleShot(True)
-            filter_delay_timer.setInterval(750)
+
+            # The column the box is for, so the timings can be kept per column
+            filter_box.column = pos
 
             # Store the timer in the filter text box so I can cross-assosiate them
             filter_box.delay_timer = filter_delay_timer
@@ -161,13 +1822,42 @@ class SmartFilterProxy(QSortFilterProxyModel):
             # For example, I might want to find [ or ] and delimit them 
             filter_box.regex = ""
 
+            # 'predicate' is the compiled version of the regex.  None means there's nothing to filter on.
+            filter_box.predicate = None
+
             # In the text change slot, look for a signal that the filter has been updated, then call the timer.
             filter_box.textChanged.connect(partial(self.filterDelay, filter_box))
             filter_delay_timer.timeout.connect(partial(self.filterDelayTimeout, filter_box))
+
+            # Pressing enter skips the wait.
+            filter_box.returnPressed.connect(partial(self.filterNow, filter_box))
     
     # This function starts the delay timer on the filter box
     def filterDelay(self, filter_box):
-        filter_box.delay_timer.start()
+        filter_box.delay_timer.start(round(self.filterDelayInterval(filter_box.column) * 1000))
+
+    # Returns how long (in seconds) to wait after a key press before filtering.  Fast filters should fire
+    #   almost right away, and slow ones should wait until the user has probably finished typing.
+    def filterDelayInterval(self, column):
+        timings = self.filter_timings.get(column)
+        if not timings:
+            # Nothing timed for this column yet, so go by the rest of the table.
+            timings = [timing for column_timings in self.filter_timings.values() for timing in column_timings]
+        if timings:
+            typical = statistics.median(timings)
+        else:
+            typical = len(self.sourceModel().original_data) * self.debounce_row_estimate
+        return min(max(self.debounce_factor * typical, self.debounce_minimum), self.debounce_maximum)
+
+    # Remembers how long a filter took, to work out the delay for the next one.
+    def recordFilterTiming(self, column, seconds):
+        self.filter_timings[column].append(seconds)
+
+    # Called when enter is pressed in a filter box.  Filters right away if the box is still waiting to.
+    def filterNow(self, filter_box):
+        if filter_box.delay_timer.isActive():
+            filter_box.delay_timer.stop()
+            self.filterDelayTimeout(filter_box)
 
     # This function is called when the timer hits timeout.  At this point, 
     # we can apply the filters
@@ -177,114 +1867,309 @@ class SmartFilterProxy(QSortFilterProxyModel):
         #   TODO: Might want to make this a special option later...
         text = text.replace('[', '\[')
         text = text.replace(']', '\]')
+        try:
+            predicate = self.compileFilter(text)
+        except re.error:
+            # The user is probably still in the middle of typing something like a '(', so leave the
+            #   current results alone until the pattern is valid.
+            return
         filter_box.regex = text
+        filter_box.predicate = predicate
+        started = time.perf_counter()
+        if self.background_filtering is True:
+            self.filter_started = (filter_box.column, started)
+            self.startBackgroundFilter()
+            # If there wasn't anything slow enough to need the worker, it's already done.
+            if self.filter_worker is None:
+                self.recordFilterTiming(filter_box.column, time.perf_counter() - started)
+            return
         self.applyFilters()
         self.sourceModel().updateView()
         # Notify the view that the data has changed
         self.layoutChanged.emit()
+        self.recordFilterTiming(filter_box.column, time.perf_counter() - started)
+
+    # Returns the compiled predicate for each filter box (None where the box has nothing to filter on).
+    def compiledFilters(self):
+        return [box.predicate for box in self.table_header.filter_boxes]
 
     def applyFilters(self):
         # Get my parent model
         parent_table_model = self.sourceModel()
 
-        # Get the original data from the source model
-        original_data = parent_table_model.original_data
+        # Whatever a lazy filter worked out so far is still good, so stop it and keep that to start from.
+        self.stopLazyScan()
+        self.stopPartialSort()
 
-        # This will store the filtered results
-        filtered_data = SmartRow()
-
-        # Get the filter boxes
-        filter_boxes = self.table_header.filter_boxes
-
-        # Iterate over each row in the original dataset and try to determine if the filter matches.
-        # This is an n^2 iteration with regex that is probably slow.  Can I make this faster?
-        for row_data in original_data:
-            row_matched = True
-            # Now iterate over the filter boxes and see if they match..
-            for pos, box in enumerate(filter_boxes):
-                # Check if the filter is a pattern I want to skip
-                if self.skipRegex(box.regex): continue
-                # Regex pattern is good.  Try to apply it to the column data.
-                if self.filterMatched(box.regex, row_data[pos]) is False:
-                    row_matched = False
-                    break
-            # If all the patterns match, then keep the data around...
-            if row_matched is True:
-                filtered_data.append(row_data)
-        
-        # I now have a new list of data that's been filtered.  Update the table model 
+        # Work out what order to run the filters in, then go through them with a bitmap of the rows that are
+        #   still in.  Each column only gets checked on the rows the columns before it let through.
+        plan = self.filterPlan(self.currentFilters())
+        if self.lazy_filtering is True and any(step.cost > 0 for step in plan):
+            self.startLazyScan(plan)
+            return
+        if self.filter_engine is not None and any(step.slow() for step in plan):
+            self.filter_engine.prepare(parent_table_model)
+        running = None
+        for step in plan:
+            # Only the slow steps go to the engine, and only those got it prepared.
+            mask, domain = step.run(running, engine=self.filter_engine if step.slow() else None)
+            self.setColumnMask(step.column, step.predicate, step.version, mask, domain)
+            running = maskAnd(running, mask)
+
+        # I now have a new bitmap of the data that's been filtered.  Update the table model 
         #  with the new filtered data
-        #print(filtered_data)
-        parent_table_model.unpaged_data = filtered_data
-                
-    # This is where we try to apply the filter to the actual text in the box...
-    def filterMatched(self, regex, column_value):
+        self.filter_mask = running
+        self.showFilteredRows()
+
+    # Starts a lazy filter.  Only enough rows get scanned to fill the first page, then the model scans more
+    #   as the view asks for them (see SmartTableModel.fetchMore).
+    def startLazyScan(self, plan):
+        parent_table_model = self.sourceModel()
+        # If the table is sorted, the rows get scanned in sorted order so the first page is the right one.
+        order = None if self.sort_order is None else self.orderPermutation()
+        self.lazy_scan = FilterScan(plan, None, len(parent_table_model.original_data), order=order)
+        parent_table_model.unpaged_data = parent_table_model.selectRows(rows=[])
+        parent_table_model.unscanned = self.lazyRows(self.lazy_scan)
+        parent_table_model.scanRows(parent_table_model.page_size)
+        if self.lazy_completion is True and parent_table_model.unscanned is not None:
+            self.lazy_timer.start()
+
+    # The generator the model pulls lazily filtered rows from.  Once the scan gets to the end, the bitmaps are
+    #   complete and get stored like any other filter's.
+    def lazyRows(self, scan):
+        yield from scan.chunks()
+        self.lazy_scan = None
+        self.lazy_timer.stop()
+        self.storeScanResults(scan, scan.results())
+        self.combineColumnMasks()
+
+    # Stops a lazy filter that hasn't got to the end.  The bitmaps so far are kept, they're good for the rows
+    #   that got scanned.
+    def stopLazyScan(self):
+        if self.lazy_scan is None:
+            return
+        self.lazy_timer.stop()
+        self.storeScanResults(self.lazy_scan, self.lazy_scan.results())
+        self.lazy_scan = None
+        self.sourceModel().unscanned = None
+
+    # Finishes off a lazy filter a little at a time, so the row count gets filled in without locking up the GUI.
+    def lazyScanTimeout(self):
+        parent_table_model = self.sourceModel()
+        stop_time = time.perf_counter() + 0.02
+        while parent_table_model.unscanned is not None and time.perf_counter() < stop_time:
+            parent_table_model.scanMore()
+        if parent_table_model.unscanned is None:
+            self.lazy_timer.stop()
+        parent_table_model.smart_table.updateRowCountLabel()
+
+    # Stores the bitmaps a FilterScan worked out.
+    def storeScanResults(self, scan, results):
+        for step in scan.steps:
+            mask, domain = results[step.column]
+            self.setColumnMask(step.column, step.predicate, step.version, mask, domain)
+
+    # Returns the compiled filter for each column that has something to filter on.
+    def currentFilters(self):
+        return {pos: box.predicate for pos, box in enumerate(self.table_header.filter_boxes) if box.predicate is not None}
+
+    # The query planner.  Makes a FilterStep for each filtered column, reusing whatever is left over from the
+    #   last filter (or is in the cache), and sorts them so the cheapest and most selective run first.
+    def filterPlan(self, predicates):
+        parent_table_model = self.sourceModel()
+        column_versions = parent_table_model.column_versions
+
+        # Throw away the bitmaps for columns that aren't being filtered anymore, and for columns that had a
+        #   cell change since their bitmap was worked out.
+        for pos in list(self.column_masks):
+            if pos not in predicates or self.mask_versions[pos] != column_versions[pos]:
+                del self.column_masks[pos]
+                del self.mask_domains[pos]
+                del self.applied_filters[pos]
+                del self.mask_versions[pos]
+
+        plan = []
+        for pos, predicate in predicates.items():
+            version = column_versions[pos]
+            # A lazy filter only looks at as many rows as it needs, so it reads them straight from the rows
+            #   instead of waiting on a copy of the whole column.
+            values = parent_table_model.columnView(pos) if self.lazy_filtering is True else parent_table_model.columnValues(pos)
+            step = FilterStep(pos, predicate, version, values,
+                              **self.reusableResults(pos, predicate, version))
+            plan.append(step)
+        plan.sort(key=FilterStep.rank)
+        self.filter_plan = plan
+        return plan
+
+    # Returns the FilterStep arguments for whatever can be reused from earlier filters on this column: the
+    #   bitmap for this exact predicate, or the rows an older, wider predicate matched.
+    def reusableResults(self, pos, predicate, version):
+        applied_predicate = self.applied_filters.get(pos)
+        if predicate != applied_predicate:
+            # If this filter was run recently, its results might still be in the cache.
+            cached = self.filter_cache.get(pos, predicate, version)
+            if cached is not None:
+                return {'mask': cached[0], 'domain': cached[1]}
+            if applied_predicate is not None and predicate.narrows(applied_predicate):
+                # Only the rows that matched the old filter in this column can match the new one.  Outside of
+                #   the old bitmap's domain nothing is known, so those rows all have to be checked.
+                mask, domain = self.column_masks[pos], self.mask_domains[pos]
+                return {'possible': mask if domain is None else maskOr(mask, maskNot(domain))}
+            return {}
+        return {'mask': self.column_masks[pos], 'domain': self.mask_domains[pos]}
+
+    # Returns a description of the plan the filters last ran with, one line per column in the order they ran.
+    def explainFilters(self):
+        return "\n".join(f"{number}. column {step.column}: {step.predicate!r}  cost {step.cost:.3g}/row, "
+                         f"selectivity {step.selectivity:.3g}" for number, step in enumerate(self.filter_plan, 1))
+
+    # Stores the bitmap for a column, along with what made it.
+    def setColumnMask(self, pos, predicate, version, mask, domain=None):
+        unchanged = (self.column_masks.get(pos) is mask and self.mask_domains.get(pos) is domain
+                     and self.applied_filters.get(pos) == predicate and self.mask_versions.get(pos) == version)
+        self.column_masks[pos] = mask
+        self.mask_domains[pos] = domain
+        self.applied_filters[pos] = predicate
+        self.mask_versions[pos] = version
+        if not unchanged:
+            self.filter_cache.put(pos, predicate, version, mask, domain)
+
+    # A row is in the results if it's set in every column's bitmap.  That holds even though the bitmaps are only
+    #   right within their domains, since a row outside a column's domain was already thrown out by a column
+    #   before it.
+    def combineColumnMasks(self):
+        self.filter_mask = None
+        for mask in self.column_masks.values():
+            self.filter_mask = maskAnd(self.filter_mask, mask)
+        return self.filter_mask
+
+    # Runs the same work as applyFilters, but on a thread from the QThreadPool so the GUI doesn't lock up.
+    #   Rows show up in the table as each chunk is scanned.
+    def startBackgroundFilter(self):
+        parent_table_model = self.sourceModel()
+
+        # Whatever is still running is for an old filter, so stop it.
+        self.cancelBackgroundFilter()
+        self.stopLazyScan()
+        self.stopPartialSort()
+
+        # The quick steps are done right here, then the ones that go row by row are handed to the worker.  The
+        #   quick ones go first even if the plan had them later, since the worker can't use the column indexes.
+        plan = self.filterPlan(self.currentFilters())
+        slow_steps = [step for step in plan if step.slow()]
+        running = None
+        for step in plan:
+            if not step.slow():
+                mask, domain = step.run(running)
+                self.setColumnMask(step.column, step.predicate, step.version, mask, domain)
+                running = maskAnd(running, mask)
+        self.filter_plan = [step for step in plan if not step.slow()] + slow_steps
+        if not slow_steps:
+            # Nothing needs scanning (a box got cleared, for example) so just finish up here.
+            self.filter_mask = running
+            self.showFilteredRows()
+            parent_table_model.updateView()
+            self.layoutChanged.emit()
+            return
+
+        if self.filter_engine is not None:
+            self.filter_engine.prepare(parent_table_model)
+
+        self.filter_generation += 1
+        # If the table is sorted, scan the rows in sorted order so they come in sorted.  The process engine can
+        #   only do runs of rows, so with that they get put in order at the end instead.
+        order = None
+        self.pending_sort_order = None
+        if self.sort_order is not None and self.filter_engine is None:
+            order = self.orderPermutation()
+            self.pending_sort_order = self.sort_order
+        scan = FilterScan(slow_steps, running, len(parent_table_model.original_data), self.filter_engine, order)
+        worker = FilterWorker(self.filter_generation, scan)
+        worker.signals.rowsMatched.connect(self.backgroundRowsMatched)
+        worker.signals.finished.connect(self.backgroundFilterFinished)
+        self.filter_worker = worker
+        # Remember what the worker is working out, to store with its results when it's done.
+        self.pending_filters = scan
+
+        # Empty the table, the matches get added back as they're found.
+        parent_table_model.unpaged_data = parent_table_model.selectRows(rows=[])
+        parent_table_model.updateView()
+        self.layoutChanged.emit()
+        QThreadPool.globalInstance().start(worker)
+
+    def cancelBackgroundFilter(self):
+        if self.filter_worker is not None:
+            self.filter_worker.cancel()
+            self.filter_worker = None
+        # Bumping the generation means anything the old worker already sent gets ignored.
+        self.filter_generation += 1
+
+    # Called (on the GUI thread) each time the background worker finishes a chunk of rows.
+    def backgroundRowsMatched(self, generation, rows):
+        if generation != self.filter_generation:
+            return
+        parent_table_model = self.sourceModel()
+        original_data = parent_table_model.original_data
+        parent_table_model.unpaged_data.extend(original_data[row] for row in rows)
+        parent_table_model.updateView()
+
+    # Called (on the GUI thread) once the background worker has gone through every row.
+    def backgroundFilterFinished(self, generation, masks):
+        if generation != self.filter_generation:
+            return
+        self.filter_worker = None
+        self.storeScanResults(self.pending_filters, masks)
+        self.combineColumnMasks()
+        # The rows came in unsorted (or the sort changed part way through), so put them in order.
+        if self.sort_order is not None and self.sort_order != self.pending_sort_order:
+            self.showFilteredRows()
+        self.sourceModel().updateView()
+        self.layoutChanged.emit()
+        if self.filter_started is not None:
+            column, started = self.filter_started
+            self.recordFilterTiming(column, time.perf_counter() - started)
+            self.filter_started = None
+
+    # Turn the text from a filter box into a predicate.  Returns None if the text is one of the
+    #   patterns we skip (an empty box, or a math operator that hasn't had a number typed yet).
+    def compileFilter(self, regex):
+        if self.skipRegex(regex): return None
+        return self.compileExpression(regex)
+
+    # This is where the filter text gets parsed.  The rules are checked in the same order they
+    #   always have been: and, then or, then not, then math, and anything else is a regex.
+    def compileExpression(self, regex):
 
         # First, check and see if the regex has an and/or in it.  If so, split it up and 
-        # perform the checks seperately
+        # compile the pieces seperately
         if self.is_and.match(regex):
-            # Split the regex by the and and call seperately
-            for sub_regex in regex.split('&&'):
-                # If any of the "AND" values return false then we don't match...
-                if self.filterMatched(sub_regex, column_value) is False:
-                    return False
-            # If I'm here, all the sub_regex AND stuff matched, so return true
-            return True
+            return AndPredicate(self.compileExpression(sub_regex) for sub_regex in regex.split('&&'))
 
-        # Now check the OR condition.  If any of the segments match, then return true
         if self.is_or.match(regex):
-            # Split the regex by the and and call seperately
-            for sub_regex in regex.split('||'):
-                # If any of the "OR" values return true then we DO match...
-                if self.filterMatched(sub_regex, column_value) is True:
-                    return True
-            # If I'm here, all the sub_regex OR stuff DIDN'T matched, so return false
-            return False
+            return OrPredicate(self.compileExpression(sub_regex) for sub_regex in regex.split('||'))
 
         if self.is_not.match(regex):
-            regex = regex.replace('!', "", 1)
-            if self.filterMatched(regex, column_value) is False:
-                return True
-            else:
-                return False
-            
+            return NotPredicate(self.compileExpression(regex.replace('!', "", 1)))
+
         # Check for math regex.  If it's math, we have to do some special stuff.
         math_search_results = self.is_math.search(regex)
-        #print(math_search_results)
         if math_search_results:
             # get the pieces of the math puzzle
-            operator = math_search_results.groups()[0]
-            is_equal = math_search_results.groups()[1]
+            operator_text = math_search_results.groups()[0] + math_search_results.groups()[1]
             value = math_search_results.groups()[2]
-            # Try to convert the value (which is a string) into a number that I can do
-            # a math operation on...
+            # If the value isn't a number, or the operator isn't one I know about, nothing can match.
+            if operator_text not in ComparePredicate.operators:
+                return ConstantPredicate(False)
             try:
-                regex_number = float(value)
-                column_number = float(column_value)
-            except:
-                # If I'm here, the user tried to do a numerical operation on a non-number OR the col value isn't.  
-                # That doens't match...
-                return False
-            
-            # Go through all the math conditions and see if they match...
-            if operator == '=' and is_equal == '=':
-                return True if (column_number == regex_number) else False
-            if operator == '>' and is_equal == '=':
-                return True if (column_number >= regex_number) else False
-            if operator == '<' and is_equal == '=':
-                return True if (column_number <= regex_number) else False
-            if operator == '>' and is_equal == '':
-                return True if (column_number > regex_number) else False
-            if operator == '<' and is_equal == '':
-                return True if (column_number < regex_number) else False
-
-            # If I'm here, then it seems like none of my math regex worked.  Should return False
-            return False
-            
-        if re.search(regex, str(column_value)):
-          return True
-        else:
-          return False
+                return ComparePredicate(operator_text, value)
+            except ValueError:
+                return ConstantPredicate(False)
+
+        return RegexPredicate(regex)
+
+    # This is where we try to apply the filter to the actual text in the box...
+    def filterMatched(self, regex, column_value):
+        return self.compileExpression(regex).matches(column_value)
 
     def skipRegex(self, pattern):
         # These are some patterns we want to skip
@@ -311,11 +2196,13 @@ class SmartTableView(QTableView):
         if self.size_to_data is True:
             self.horizontalHeader().setMaximumSectionSize(min_size)
             self.resizeColumnsToContents()
-            self.resizeRowsToContents()
+            # Fixed height rows (see SmartTable.enableVirtualScrolling) stay that way, and there could be millions of them.
+            if self.verticalHeader().sectionResizeMode(0) != QHeaderView.ResizeMode.Fixed:
+                self.resizeRowsToContents()
             self.horizontalHeader().setMaximumSectionSize(max_size)
 
 class SmartTable():
-    def __init__(self, data, headers, page_size=1000, parent=None):
+    def __init__(self, data, headers, page_size=1000, parent=None, columnar:bool=False):
 
         # Make a new QTableView
         self.table_view = SmartTableView()
@@ -326,7 +2213,7 @@ class SmartTable():
         self.container_layout.addWidget(self.table_view,2,1)
 
         # make a table model
-        self.table_model = SmartTableModel(data, headers, page_size=page_size, parent=self.container_widget, smart_table=self)
+        self.table_model = SmartTableModel(data, headers, page_size=page_size, parent=self.container_widget, smart_table=self, columnar=columnar)
         self.table_view.setModel(self.table_model)
         self.table_model.setTableView(self.table_view)
         self.proxy_model = None
@@ -366,7 +2253,17 @@ class SmartTable():
     
     def updateRowCountLabel(self):
         if self.count_label is not None:
-            self.count_label.setText(f"Row Count: {len(self.table_model.unpaged_data)}")
+            if self.proxy_model is not None and self.proxy_model.filter_worker is not None:
+                self.count_label.setText(f"Filtering… {len(self.table_model.unpaged_data)} matched so far")
+            elif self.proxy_model is not None and self.proxy_model.partial_sort is not None:
+                self.count_label.setText(f"Row Count: {self.proxy_model.partial_sort_count} (sorting…)")
+            elif self.proxy_model is not None and self.proxy_model.sort_request is not None:
+                self.count_label.setText(f"Row Count: {len(self.table_model.unpaged_data)} (sorting…)")
+            elif self.table_model.unscanned is not None:
+                # A lazy filter hasn't looked at every row yet, so there's at least this many.
+                self.count_label.setText(f"Row Count: ≥{len(self.table_model.unpaged_data)}")
+            else:
+                self.count_label.setText(f"Row Count: {len(self.table_model.unpaged_data)}")
 
     def enableSorting(self, switch:bool=True, order=Qt.SortOrder.AscendingOrder):
         if switch is True:
@@ -384,6 +2281,19 @@ class SmartTable():
             self.proxy_model.setDynamicSortFilter(False)
             self.table_view.setSortingEnabled(False)
 
+    # This function spreads the filter scans over several processes so a CPU heavy regex filter can use all
+    #  the cores in the machine.  It can be used together with background filtering.
+    def enableMultiProcessFiltering(self, switch:bool=True, max_workers:int=None):
+        if switch is True and self.filter_header is None:
+            self.enableFiltering(True)
+        if self.proxy_model is None:
+            return
+        if self.proxy_model.filter_engine is not None:
+            self.proxy_model.filter_engine.shutdown()
+            self.proxy_model.filter_engine = None
+        if switch is True:
+            self.proxy_model.filter_engine = ProcessFilterEngine(max_workers)
+
     def toggleColumnHidden(self, column_name:str, switch:bool=True):
         # from the column name, get the index of the column
         try:
@@ -409,6 +2319,70 @@ class SmartTable():
             self.table_view.setHorizontalHeader(self.filter_header)
             self.filter_header.alignFilterBoxes()
             self.proxy_model.connectTextToFilter(self.filter_header)
+
+    # This function gives the filter box of every column with only a few distinct values (status, owner, region...)
+    #  a drop down list of those values.
+    def enableDistinctValueDropdowns(self, switch:bool=True):
+        if switch is True and self.filter_header is None:
+            self.enableFiltering(True)
+        if self.filter_header is None:
+            return
+        for column, filter_box in enumerate(self.filter_header.filter_boxes):
+            distinct_values = self.table_model.columnValues(column).distinctValues() if switch is True else None
+            if distinct_values is not None:
+                self.filter_header.setDistinctValues(column, distinct_values[0])
+            else:
+                filter_box.setCompleter(None)
+
+    # This function makes filtering lazy: only enough rows get filtered to fill the page the table is showing,
+    #   and the rest get filtered as the table is scrolled down.  If 'complete' is set, the rest of the rows
+    #   also get filtered a bit at a time whenever the GUI isn't busy, so the row count gets finished.
+    def enableLazyFiltering(self, switch:bool=True, complete:bool=False):
+        if switch is True and self.filter_header is None:
+            self.enableFiltering(True)
+        if self.proxy_model is not None:
+            self.proxy_model.lazy_filtering = switch
+            self.proxy_model.lazy_completion = complete
+            if switch is False and self.proxy_model.lazy_scan is not None:
+                # Filter the rest of the rows now.
+                self.table_model.scanRows()
+                self.updateRowCountLabel()
+            elif complete is True and self.proxy_model.lazy_scan is not None:
+                self.proxy_model.lazy_timer.start()
+
+    # This function returns how long (in seconds) the last few filters took, by the column of the box that set
+    #   them off.  These are what the delay before a filter box fires is based on.
+    def filterTimings(self) -> dict:
+        if self.proxy_model is None:
+            return {}
+        return {column: list(timings) for column, timings in self.proxy_model.filter_timings.items()}
+
+    # This function returns the order the filters last ran in, and the cost and selectivity guessed for each.
+    #   Handy for working out why a filter is slow.
+    def explainFilters(self) -> str:
+        if self.proxy_model is None:
+            return ""
+        return self.proxy_model.explainFilters()
+
+    # This function sets how much memory (in bytes) the cache of recent filter results can use.  0 turns it off.
+    def setFilterCacheSize(self, memory_budget:int):
+        if self.proxy_model is None:
+            self.proxy_model = SmartFilterProxy()
+        self.proxy_model.filter_cache.setMemoryBudget(memory_budget)
+
+    # This function moves the filter scans onto a background thread.  The table keeps responding while a slow
+    #  filter runs, rows show up as they're found, and typing a new filter cancels the old scan.
+    def enableBackgroundFiltering(self, switch:bool=True):
+        if switch is True and self.filter_header is None:
+            self.enableFiltering(True)
+        if self.proxy_model is not None:
+            self.proxy_model.background_filtering = switch
+            if switch is False and self.proxy_model.filter_worker is not None:
+                # Finish the filter that was running in the background here instead.
+                self.proxy_model.cancelBackgroundFilter()
+                self.proxy_model.applyFilters()
+                self.table_model.updateView()
+                self.proxy_model.layoutChanged.emit()
     
     def enableEdit(self, column_name:str=None):
         if column_name is None:
@@ -423,6 +2397,81 @@ class SmartTable():
                 edit_box = textEditDelegate(self.table_view)
                 self.table_view.setItemDelegateForColumn(column_index, edit_box)
 
+    # This function sorts on another thread, so clicking a header doesn't freeze the table while a column gets
+    #   sorted for the first time.  The rows stay as they are, with the header showing it's busy, until the sort
+    #   is done.  Clicking another header cancels it.  Turn it on before enableSorting to sort the first
+    #   column in the background too.
+    def enableBackgroundSorting(self, switch:bool=True):
+        if self.proxy_model is None:
+            self.proxy_model = SmartFilterProxy()
+        self.proxy_model.background_sorting = switch
+        # Finish a sort that's still going, here and now.
+        if switch is False and self.proxy_model.sort_request is not None:
+            self.proxy_model.setSortOrder(self.proxy_model.sort_request)
+
+    # This function puts every row in the view at once, instead of loading a page at a time as it scrolls down,
+    #   so the scroll bar can jump straight to any row (Ctrl+End works too).  All the rows are the same height
+    #   ('row_height' pixels, or the default), which lets the view work out where a row is without looking at
+    #   the rows above it, and only the rows on the screen get asked for their data.
+    def enableVirtualScrolling(self, switch:bool=True, row_height:int=None):
+        vertical_header = self.table_view.verticalHeader()
+        if switch is True:
+            vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+            if row_height is not None:
+                vertical_header.setDefaultSectionSize(row_height)
+        else:
+            vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table_model.virtual = switch
+        self.table_model.updateView()
+        if self.proxy_model is not None:
+            self.proxy_model.layoutChanged.emit()
+
+    # This function is for changing lots of cells from code.  Inside a 'with table.batchUpdate():' block the
+    #   changes don't go to the view one at a time, it all gets updated once at the end.  Anything cached from a
+    #   column (filter results, sorts) only gets thrown away once too, so it doesn't see the changes until the
+    #   block ends.  Use the batchUpdate function for rows that are in more than one table.
+    @contextmanager
+    def batchUpdate(self):
+        self.table_model.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.table_model.batch_depth -= 1
+            if self.table_model.batch_depth == 0:
+                self.table_model.finishBatch()
+
+    # This function makes sorting a big table show the first page right away.  The rows for each page get picked
+    #   out as the table scrolls down to them, while the full sort runs in the background.  Only tables with
+    #   at least 'minimum_rows' rows bother.
+    def enablePartialSorting(self, switch:bool=True, minimum_rows:int=200000):
+        if self.proxy_model is None:
+            self.proxy_model = SmartFilterProxy()
+        self.proxy_model.partial_sorting = switch
+        self.proxy_model.partial_sort_minimum_rows = minimum_rows
+
+    # This function sorts the table by more than one column.  Give it a list of columns (names or numbers), or
+    #   (column, descending) pairs, main one first.  Shift clicking the headers does the same thing.
+    def sortByColumns(self, columns:list):
+        if self.proxy_model is None:
+            self.enableSorting(True)
+        sort_order = []
+        for column in columns:
+            column, descending = column if isinstance(column, tuple) else (column, False)
+            if isinstance(column, str):
+                column = self.table_model._headers.index(column)
+            sort_order.append((column, descending))
+        self.proxy_model.setSortOrder(sort_order)
+
+    # This function sets how a column gets sorted.  'text' sorts everything as text, so things like zip codes
+    #   or part numbers that look like numbers keep their text order.  'number' (or None, which works it out
+    #   from the values) sorts numbers by value, then text, then NaN.
+    def setColumnType(self, column, column_type:str=None):
+        if column_type not in (None, 'number', 'text'):
+            raise ValueError(f"Unknown column type {column_type!r}, expected 'number', 'text' or None")
+        if isinstance(column, str):
+            column = self.table_model._headers.index(column)
+        self.table_model.column_types[column] = column_type
+
     def getWidget(self):
         """
         This function will return the group box where the table and other stuff associated with the table
@@ -452,6 +2501,15 @@ class SmartTable():
             self.tool_bar = SmartToolbar(self)
             self.container_layout.addWidget(self.tool_bar,1,1)
 
+# Does a batch update (see SmartTable.batchUpdate) on several tables at once, for changing rows that are shared
+#   between them.
+@contextmanager
+def batchUpdate(*smart_tables):
+    with ExitStack() as stack:
+        for smart_table in smart_tables:
+            stack.enter_context(smart_table.batchUpdate())
+        yield
+
 class SmartToolbar(QToolBar):
     def __init__(self, parent_table:SmartTable):
         super().__init__()
@@ -503,21 +2561,51 @@ class textEditDelegate(QItemDelegate):
         model.setData(index, text_box_value, Qt.ItemDataRole.EditRole)
     
 class SmartTableModel(QAbstractTableModel):
-    def __init__(self, data, headers, page_size=100, parent=None, smart_table:SmartTable=None):
+    def __init__(self, data, headers, page_size=100, parent=None, smart_table:SmartTable=None, columnar:bool=False):
         super().__init__(parent)
-        # Convert the 2nd order list into a smart row, and store what table it belongs to...
-        self._data = []
-        for row, sublist in enumerate(data):
-            if isinstance(sublist, SmartRow) is False:
-                smart_row = SmartRow(sublist)
-                data[row] = smart_row
-            data[row].smart_tables.append(smart_table)
-            self._data.append(data[row])
+        # With columnar storage, the data lives in a ColumnarStore and rows are only views into it.
+        self.column_store = None
+        if columnar is True or isinstance(data, ColumnarStore):
+            if isinstance(data, ColumnarStore) is False:
+                data = ColumnarStore(data, len(headers))
+            self.column_store = data
+            self.column_store.smart_tables.append(smart_table)
+            self._data = ColumnarRows(self.column_store)
+        else:
+            # Convert the 2nd order list into a smart row, and store what table it belongs to...  Rows that were
+            #   in the same tables before share the same smart_tables tuple afterwards too.
+            self._data = []
+            shared_tables = {}
+            for row, sublist in enumerate(data):
+                if isinstance(sublist, SmartRow) is False:
+                    smart_row = SmartRow(sublist)
+                    data[row] = smart_row
+                smart_tables = data[row]._smart_tables
+                new_smart_tables = shared_tables.get(smart_tables)
+                if new_smart_tables is None:
+                    new_smart_tables = shared_tables[smart_tables] = smart_tables + (smart_table,)
+                data[row]._smart_tables = new_smart_tables
+                self._data.append(data[row])
 
         self.unpaged_data = self._data
+        # Rows that belong in unpaged_data but haven't been worked out yet, from a lazy filter that hasn't been to
+        #   every row (see SmartFilterProxy.startLazyScan) or a partial sort (see SmartFilterProxy.startPartialSort).
+        #   A generator that gives lists of row numbers in original_data, to go on the end of unpaged_data.
+        self.unscanned = None
+        # This goes up every time a cell changes, so anything cached from the data knows it's stale.
+        self.data_version = 0
+        # Same thing, but one per column.  Only the column a cell is in goes up.
+        self.column_versions = [0] * len(headers)
+        # column -> (column version, SmartColumn of the values), built when something asks for them.
+        self.column_cache = {}
         self._headers = headers
         self.original_data = self._data
         self.editable_columns = [False] * len(self._headers)
+        # How each column gets sorted: 'number', 'text', or None to work it out from the values.
+        #   See SmartTable.setColumnType.
+        self.column_types = [None] * len(self._headers)
+        # column -> text added to the header to show where it is in a multi-column sort, like "▲1".
+        self.sort_indicators = {}
         self.table_view = None
         self.smart_table = smart_table
 
@@ -532,19 +2620,192 @@ class SmartTableModel(QAbstractTableModel):
         self.background_role_function = None
         self.foreground_role_function = None
         
-        # Prune the data to the page size
-        self._data = self.original_data[0:page_size]
+        # Where each row is in unpaged_data, so an edit can tell the view which row changed straight away.
+        #   position_source is the unpaged_data it was worked out for, and position_count how many of its rows
+        #   are in it.  See updateRowPositions.
+        self.row_positions = None
+        self.position_source = None
+        self.position_count = 0
+
+        # During a batch update (see SmartTable.batchUpdate) batch_depth is above 0, and cell changes get saved
+        #   up here instead of going straight to the view.  batch_columns are the columns that changed, and
+        #   batch_cells is column -> the rows in the view that changed in it.
+        self.batch_depth = 0
+        self.batch_columns = set()
+        self.batch_cells = defaultdict(set)
+        self.batch_signal_limit = 100
+
+        # With virtual scrolling every row of unpaged_data is in the view, and the view only asks for the ones on
+        #   the screen.  row_cache keeps the text of the last few hundred rows it asked for, by position.
+        #   See SmartTable.enableVirtualScrolling.
+        self.virtual = False
+        self.row_cache = OrderedDict()
+        self.row_cache_size = 256
+
+        # Only show the first page.  _data is a RowWindow onto unpaged_data, so the rows aren't copied.
+        self._data = RowWindow(self.unpaged_data, page_size)
         self.view_size = len(self._data)
 
     def rowCount(self, parent=None):
         return len(self._data)
 
+    # Returns a SmartColumn of every value in a column of original_data.  It's kept around until a cell in that column changes.
+    #   A columnar table just hands back the column itself.
+    def columnValues(self, column):
+        if self.column_store is not None:
+            return self.column_store.columns[column]
+        # Only rebuild it if a cell in this column changed.  Edits in other columns don't matter.
+        version, values = self.column_cache.get(column, (None, None))
+        if version != self.column_versions[column]:
+            values = SmartColumn(row[column] for row in self.original_data)
+            self.column_cache[column] = (self.column_versions[column], values)
+        return values
+
+    # Like columnValues, except a row based table's column doesn't get copied out of the rows if it isn't
+    #   already.  Instead it hands back a RowColumn that reads each value from its row when it's asked for.
+    def columnView(self, column):
+        if self.column_store is not None:
+            return self.column_store.columns[column]
+        version, values = self.column_cache.get(column, (None, None))
+        if version == self.column_versions[column]:
+            return values
+        return RowColumn(self.original_data, column)
+
     def columnCount(self, parent=None):
         return len(self._headers)
 
     def setTableView(self, table_view):
         self.table_view = table_view
 
+    # Returns a new list of rows from original_data.  Either the rows set in a bitmap, the row numbers given,
+    #   or every row if neither is given.  Columnar tables get back a ColumnarRows instead of a list.
+    def selectRows(self, mask=None, rows=None):
+        if mask is not None:
+            rows = compress(range(len(self.original_data)), mask)
+        if self.column_store is not None:
+            return ColumnarRows(self.column_store, None if rows is None else array('q', rows))
+        if rows is None:
+            return list(self.original_data)
+        return [self.original_data[row] for row in rows]
+
+    # Called when the value in a cell changes, so the view can update that cell.
+    def cellChanged(self, row_data, column):
+        if self.batch_depth > 0:
+            self.saveChange(row_data, column)
+            return
+        self.data_version += 1
+        if isinstance(column, int):
+            self.column_versions[column] += 1
+        else:
+            self.column_versions = [version + 1 for version in self.column_versions]
+        # A row that isn't in the view (filtered out, or not paged in yet) gets shown as it is when it comes in.
+        table_row = self.rowPosition(row_data)
+        if table_row is None or table_row >= len(self._data):
+            return
+        self.row_cache.pop(table_row, None)
+        if isinstance(column, int):
+            self.dataChanged.emit(self.index(table_row, column), self.index(table_row, column))
+        else:
+            self.dataChanged.emit(self.index(table_row, 0), self.index(table_row, self.columnCount() - 1))
+
+    # Remembers a cell change during a batch update (see SmartTable.batchUpdate), for finishBatch.
+    def saveChange(self, row_data, column):
+        columns = [column] if isinstance(column, int) else range(self.columnCount())
+        self.batch_columns.update(columns)
+        table_row = self.rowPosition(row_data)
+        if table_row is not None and table_row < len(self._data):
+            for changed_column in columns:
+                self.batch_cells[changed_column].add(table_row)
+
+    # Lets everything know about the changes saved up during a batch update.  Each changed column's version
+    #   only goes up once, and the view gets one dataChanged for each block of changed cells.  If there would
+    #   be more than batch_signal_limit of them it just gets one that covers all of them.
+    def finishBatch(self):
+        cells = self.batch_cells
+        if self.batch_columns:
+            self.data_version += 1
+            for column in self.batch_columns:
+                self.column_versions[column] += 1
+        self.batch_columns = set()
+        self.batch_cells = defaultdict(set)
+        if not cells:
+            return
+
+        self.row_cache.clear()
+        ranges = self.changedRanges(cells)
+        if sum(len(runs) for first_column, last_column, runs in ranges) > self.batch_signal_limit:
+            first_row = min(runs[0][0] for first_column, last_column, runs in ranges)
+            last_row = max(runs[-1][1] for first_column, last_column, runs in ranges)
+            self.dataChanged.emit(self.index(first_row, ranges[0][0]), self.index(last_row, ranges[-1][1]))
+            return
+        for first_column, last_column, runs in ranges:
+            for first_row, last_row in runs:
+                self.dataChanged.emit(self.index(first_row, first_column), self.index(last_row, last_column))
+
+    # Turns {column: set of rows} into a list of [first column, last column, [(first row, last row), ...]]
+    #   blocks.  Rows next to each other become one run, and columns next to each other with the same runs
+    #   become one block.
+    @staticmethod
+    def changedRanges(cells):
+        ranges = []
+        for column in sorted(cells):
+            runs = []
+            for row in sorted(cells[column]):
+                if runs and runs[-1][1] == row - 1:
+                    runs[-1] = (runs[-1][0], row)
+                else:
+                    runs.append((row, row))
+            if ranges and ranges[-1][1] == column - 1 and ranges[-1][2] == runs:
+                ranges[-1][1] = column
+            else:
+                ranges.append([column, column, runs])
+        return ranges
+
+    # Returns where a row is in unpaged_data, or None if it isn't in there, without searching for it.
+    def rowPosition(self, row_data):
+        self.updateRowPositions()
+        if self.column_store is not None:
+            if not isinstance(row_data, ColumnarRow) or row_data.store is not self.column_store:
+                return None
+            if self.row_positions is None:
+                return row_data.row if row_data.row < len(self.unpaged_data) else None
+            position = int(self.row_positions[row_data.row])
+            return position if position >= 0 else None
+        return self.row_positions.get(id(row_data))
+
+    # Keeps row_positions up to date with unpaged_data.  When unpaged_data is a new list (a filter or a sort) it
+    #   all gets worked out again, the next time it's needed.  When rows only got added on the end (a lazy filter
+    #   or a partial sort) just those get added.  Loading pages doesn't change where anything is.
+    def updateRowPositions(self):
+        rows = self.unpaged_data
+        if rows is not self.position_source:
+            self.position_source = rows
+            self.position_count = 0
+            self.row_positions = None if self.column_store is not None else {}
+        if self.column_store is not None and rows.rows is not None and self.row_positions is None:
+            # It was every row in order, and then some rows got added on the end.
+            self.position_count = 0
+        if self.position_count == len(rows):
+            return
+
+        if self.column_store is None:
+            # Plain rows can't be hashed (they're lists), but they're the same objects in every list they're in.
+            self.row_positions.update((id(row_data), position) for position, row_data in enumerate(islice(rows, self.position_count, None), self.position_count))
+        elif rows.rows is not None:
+            # Columnar rows are just row numbers, so this is a row number -> position array, -1 if it isn't there.
+            row_count = self.column_store.row_count
+            if np is not None:
+                if self.row_positions is None:
+                    self.row_positions = np.full(row_count, -1, dtype=np.int64)
+                row_numbers = np.frombuffer(rows.rows, dtype=np.int64)[self.position_count:]
+                self.row_positions[row_numbers] = np.arange(self.position_count, len(rows), dtype=np.int64)
+            else:
+                if self.row_positions is None:
+                    self.row_positions = array('q', [-1]) * row_count
+                for position in range(self.position_count, len(rows)):
+                    self.row_positions[rows.rows[position]] = position
+        self.position_count = len(rows)
+
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if not index.isValid() or not (0 <= index.row() < self.rowCount()) or not (0 <= index.column() < self.columnCount()):
             return None
@@ -554,6 +2815,8 @@ class SmartTableModel(QAbstractTableModel):
 
         if role == Qt.ItemDataRole.DisplayRole:
             #print(self._data[row])
+            if self.virtual is True:
+                return self.displayRow(row)[column]
             return str(self._data[row][column])
 
         if role == Qt.ItemDataRole.BackgroundRole:
@@ -565,6 +2828,18 @@ class SmartTableModel(QAbstractTableModel):
 
         return None
 
+    # Returns the text of every cell in a row of the view, from row_cache if it's been shown lately.
+    def displayRow(self, row):
+        texts = self.row_cache.get(row)
+        if texts is None:
+            texts = [str(value) for value in self._data[row]]
+            self.row_cache[row] = texts
+            if len(self.row_cache) > self.row_cache_size:
+                self.row_cache.popitem(last=False)
+        else:
+            self.row_cache.move_to_end(row)
+        return texts
+
     def setData(self, index, value, role):
         if role == Qt.ItemDataRole.EditRole:
             self._data[index.row()][index.column()] = value
@@ -574,6 +2849,8 @@ class SmartTableModel(QAbstractTableModel):
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
         if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            if section in self.sort_indicators:
+                return f"{self._headers[section]} {self.sort_indicators[section]}"
             return self._headers[section]
 
         return None
@@ -590,10 +2867,11 @@ class SmartTableModel(QAbstractTableModel):
     def updateView(self):
         # Get the new length of the data
         new_view_size = len(self.unpaged_data)
-        if new_view_size > self.page_size:
+        if new_view_size > self.page_size and self.virtual is False:
             new_view_size = self.page_size
 
-        self._data = self.unpaged_data[0:new_view_size]
+        self._data = RowWindow(self.unpaged_data, new_view_size)
+        self.row_cache.clear()
 
         # By how much as the row size changed
         new_row_difference = new_view_size - self.view_size
@@ -617,19 +2895,38 @@ class SmartTableModel(QAbstractTableModel):
         else:
             return
 
+    # Adds the next chunk of rows from a lazy filter or partial sort to unpaged_data.
+    def scanMore(self):
+        rows = next(self.unscanned, None)
+        if rows is None:
+            self.unscanned = None
+            return
+        self.unpaged_data.extend(self.original_data[row] for row in rows)
+
+    # Keeps pulling rows from a lazy filter or partial sort until unpaged_data has 'count' rows, or there are no
+    #   more.  With no count it finishes the whole thing.
+    def scanRows(self, count=None):
+        while self.unscanned is not None and (count is None or len(self.unpaged_data) < count):
+            self.scanMore()
+
     def canFetchMore(self, parent: QModelIndex) -> bool:
-        if len(self._data) < len(self.unpaged_data):
+        if len(self._data) < len(self.unpaged_data) or self.unscanned is not None:
             return True
         else:
             return False
 
     def fetchMore(self, parent: QModelIndex) -> None:
+        # If a lazy filter or partial sort is running, get it to find the next page of rows first.
+        if self.unscanned is not None:
+            self.scanRows(len(self._data) + self.page_size)
+            self.smart_table.updateRowCountLabel()
+
         # Calculate how mnay available items there are to fetch
         unpaged_data_length = len(self.unpaged_data)
         paged_data_length = len(self._data)
         available_items = unpaged_data_length - paged_data_length
         # Don't load more than the page size allows...
-        if available_items > self.page_size:
+        if available_items > self.page_size and self.virtual is False:
             available_items = self.page_size
         # I shouldn't get something less than 0, but if I do, just return.
         if available_items <= 0:
@@ -639,8 +2936,8 @@ class SmartTableModel(QAbstractTableModel):
             available_items = unpaged_data_length - paged_data_length
 
         # Insert the new rows
-        # Add the data from the unpaged data
-        self._data = self.unpaged_data[0:len(self._data)+available_items]
+        # Just make the window onto the unpaged data bigger
+        self._data = RowWindow(self.unpaged_data, paged_data_length + available_items)
         self.beginInsertRows(QModelIndex(), paged_data_length, paged_data_length+available_items-1)
         self.endInsertRows()
         self.view_size = len(self._data)
@@ -649,35 +2946,357 @@ class SmartTableModel(QAbstractTableModel):
         pass
 
 
-class SmartRow(UserList):
-    def __init__(self, data=[]):
+# One row of a table.  It acts like a list of the cell values, but it's kept small since there's one per row:
+#   the values are in a tuple, the formulas list only gets made if something asks for it, and smart_tables is a
+#   tuple shared by every row that's in the same tables (see SmartTableModel).  It does everything the old
+#   UserList version did, except there's no data list any more, the values are in cells.
+class SmartRow(MutableSequence):
+    __slots__ = ('cells', 'hidden', '_smart_tables', '_formulas')
+
+    def __init__(self, data=()):
+        self.cells = tuple(data)
         self.hidden = False
+        # All the smart tables this row exists in.  Then, when I update one cell I can update all the cells in the views...
+        self._smart_tables = ()
+        self._formulas = None
+
+    # A shadow list that will store formulas, but not the actual value
+    @property
+    def formulas(self):
+        if self._formulas is None:
+            self._formulas = [None] * len(self.cells)
+        return self._formulas
+
+    @formulas.setter
+    def formulas(self, formulas):
+        self._formulas = formulas
+
+    # The tables this row is in, as a list.  Changing it (smart_tables.append(table) and so on) swaps in a new
+    #   tuple for this row only, since the tuple can be shared with other rows.
+    @property
+    def smart_tables(self):
+        return RowTables(self)
+
+    @smart_tables.setter
+    def smart_tables(self, smart_tables):
+        self._smart_tables = smart_tables if type(smart_tables) is tuple else tuple(smart_tables)
+
+    # Adds a table to the ones this row tells about its changes.
+    def addTable(self, smart_table):
+        self._smart_tables = self._smart_tables + (smart_table,)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SmartRow(self.cells[index])
+        return self.cells[index]
 
-        # Create a shadow list that will store formulas, but not the actual value
-        self.formulas = [None] * len(data)
+    def __setitem__(self, index, value):
+        #print(f"Setting Value {value} at index {index}")
+        cells = list(self.cells)
+        cells[index] = value
+        self.cells = tuple(cells)
+        # Now that the data is set, update the views of all the tables.
+        for main_table in self._smart_tables:
+            # Find the row that this row lives in...
+            try:
+                main_table.table_model.cellChanged(self, index)
+            except:
+                continue
 
-        # Store a list of all the smart tables this row exists in.  Then, when I update one cell I can update all the cells in the views...
-        self.smart_tables = []
+    def __delitem__(self, index):
+        cells = list(self.cells)
+        del cells[index]
+        self.cells = tuple(cells)
+        if self._formulas is not None:
+            del self._formulas[index]
+
+    def insert(self, index, value):
+        cells = list(self.cells)
+        cells.insert(index, value)
+        self.cells = tuple(cells)
+        if self._formulas is not None:
+            self._formulas.insert(index, None)
+
+    def append(self, value):
+        self.cells = self.cells + (value,)
+        if self._formulas is not None:
+            self._formulas.append(None)
+
+    def reverse(self):
+        self.cells = self.cells[::-1]
+
+    def sort(self, *args, **kwargs):
+        self.cells = tuple(sorted(self.cells, *args, **kwargs))
+
+    def copy(self):
+        return SmartRow(self.cells)
+
+    def __add__(self, other):
+        if isinstance(other, SmartRow):
+            return SmartRow(self.cells + other.cells)
+        return SmartRow(self.cells + tuple(other))
+
+    def __radd__(self, other):
+        return SmartRow(tuple(other) + self.cells)
 
-        super().__init__(data)
+    def __mul__(self, count):
+        return SmartRow(self.cells * count)
+
+    __rmul__ = __mul__
+
+    def __imul__(self, count):
+        self.cells = self.cells * count
+        if self._formulas is not None:
+            self._formulas = self._formulas * count
+        return self
+
+    # Compares like a list, the same as it did when it was a UserList.
+    @staticmethod
+    def comparable(other):
+        if isinstance(other, SmartRow):
+            return list(other.cells)
+        if isinstance(other, list):
+            return other
+        return None
+
+    def __eq__(self, other):
+        other = self.comparable(other)
+        return NotImplemented if other is None else list(self.cells) == other
+
+    def __lt__(self, other):
+        other = self.comparable(other)
+        return NotImplemented if other is None else list(self.cells) < other
+
+    def __le__(self, other):
+        other = self.comparable(other)
+        return NotImplemented if other is None else list(self.cells) <= other
+
+    def __gt__(self, other):
+        other = self.comparable(other)
+        return NotImplemented if other is None else list(self.cells) > other
+
+    def __ge__(self, other):
+        other = self.comparable(other)
+        return NotImplemented if other is None else list(self.cells) >= other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self.cells))
+
+# What SmartRow.smart_tables gives back: a list of the tables a row is in, that changes the row's tuple of
+#   tables when it's changed.
+class RowTables(MutableSequence):
+    __slots__ = ('row',)
+
+    def __init__(self, row):
+        self.row = row
+
+    def __len__(self):
+        return len(self.row._smart_tables)
+
+    def __iter__(self):
+        return iter(self.row._smart_tables)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.row._smart_tables[index])
+        return self.row._smart_tables[index]
 
     def __setitem__(self, index, value):
-        #print(f"Setting Value {value} at index {index}")
-        super().__setitem__(index, value)
+        smart_tables = list(self.row._smart_tables)
+        smart_tables[index] = value
+        self.row._smart_tables = tuple(smart_tables)
+
+    def __delitem__(self, index):
+        smart_tables = list(self.row._smart_tables)
+        del smart_tables[index]
+        self.row._smart_tables = tuple(smart_tables)
+
+    def insert(self, index, value):
+        smart_tables = list(self.row._smart_tables)
+        smart_tables.insert(index, value)
+        self.row._smart_tables = tuple(smart_tables)
+
+    def append(self, value):
+        self.row.addTable(value)
+
+    def __eq__(self, other):
+        if isinstance(other, (RowTables, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self.row._smart_tables))
+
+
+# The columnar way of storing a table's data.  Instead of a SmartRow object per row, each column is kept in the
+#   most compact form that fits it (see makeColumn).  Rows only exist as ColumnarRow views, made when asked for.
+#   Like SmartRows, one store can be shown by more than one SmartTable.
+class ColumnarStore():
+    def __init__(self, data, column_count):
+        self.row_count = len(data)
+        self.columns = [self.makeColumn([row[column] for row in data]) for column in range(column_count)]
+        # All the smart tables this data is shown in, so they can all be updated when a cell changes.
+        self.smart_tables = []
+
+    # Picks how to store a column.  All ints or all floats go in a typed array.  Other values get dictionary
+    #   encoded if there are enough repeats to make that worth it, otherwise they stay a list.
+    @staticmethod
+    def makeColumn(values):
+        value_types = set(map(type, values))
+        if value_types == {int}:
+            try:
+                return NumericColumn('q', values)
+            except OverflowError:
+                pass
+        if value_types == {float}:
+            return NumericColumn('d', values)
+        try:
+            column = DictionaryColumn(values)
+        except TypeError:
+            # Something in here can't be hashed
+            return SmartColumn(values)
+        if len(column.values) > len(values) / 2:
+            return SmartColumn(values)
+        return column
+
+    def value(self, row, column):
+        return self.columns[column][row]
+
+    def setValue(self, row, column, value):
+        try:
+            self.columns[column][row] = value
+        except (TypeError, OverflowError):
+            # The value doesn't fit the way the column is stored (text typed into a number column, or an int too
+            #   big for 64 bits, for example), so fall back to a plain list for this column.
+            self.columns[column] = SmartColumn(self.columns[column])
+            self.columns[column][row] = value
+
         # Now that the data is set, update the views of all the tables.
         for main_table in self.smart_tables:
-            # Find the row that this row lives in...
             try:
-                table_row = main_table.table_model._data.index(self)
-                index_to_change = main_table.table_model.index(table_row, index)
-                main_table.table_model.dataChanged.emit(index_to_change, index_to_change)
-                #print(f"Updating Position: {table_row},{index}")
+                main_table.table_model.cellChanged(ColumnarRow(self, row), column)
             except:
                 continue
 
-    def append(self, value):
-        self.formulas.append(None)
-        super().append(value)
+# One row of a ColumnarStore.  It acts like the list of values in the row, but reads and writes go straight
+#   through to the columns.
+class ColumnarRow():
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def smart_tables(self):
+        return self.store.smart_tables
+
+    def __len__(self):
+        return len(self.store.columns)
+
+    def __iter__(self):
+        row = self.row
+        return (column[row] for column in self.store.columns)
+
+    def __getitem__(self, column):
+        if isinstance(column, slice):
+            return [values[self.row] for values in self.store.columns[column]]
+        return self.store.columns[column][self.row]
+
+    def __setitem__(self, column, value):
+        self.store.setValue(self.row, column, value)
+
+    def __eq__(self, other):
+        if isinstance(other, ColumnarRow):
+            return self.store is other.store and self.row == other.row
+        return list(self) == other
+
+    def __hash__(self):
+        return hash((id(self.store), self.row))
+
+    def __repr__(self):
+        return repr(list(self))
+
+# A list of rows from a ColumnarStore.  It only holds the row numbers (or nothing at all when it's every row
+#   in order), and makes a ColumnarRow when one is asked for.  This is what a columnar table uses for
+#   original_data, unpaged_data and _data.
+class ColumnarRows():
+    def __init__(self, store, rows=None):
+        self.store = store
+        # None means every row of the store, in order.  Otherwise an array of row numbers.
+        self.rows = rows
+
+    def rowNumbers(self):
+        if self.rows is None:
+            return range(self.store.row_count)
+        return self.rows
+
+    def __len__(self):
+        return len(self.rowNumbers())
+
+    def __iter__(self):
+        store = self.store
+        return (ColumnarRow(store, row) for row in self.rowNumbers())
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return ColumnarRows(self.store, array('q', self.rowNumbers()[position]))
+        return ColumnarRow(self.store, self.rowNumbers()[position])
+
+    def extend(self, row_data):
+        if self.rows is None:
+            self.rows = array('q', self.rowNumbers())
+        self.rows.extend(row.row for row in row_data)
+
+# One column of a list of SmartRows, read from the rows as the values are asked for instead of copied out of
+#   them.  Slicing it gives a list of the values in that slice.  See SmartTableModel.columnView.
+class RowColumn():
+    def __init__(self, rows, column):
+        self.rows = rows
+        self.column = column
+
+    def __len__(self):
+        return len(self.rows)
+
+    # Going through the cells tuples keeps the whole thing in C, no SmartRow.__getitem__ call per row.
+    def __iter__(self):
+        return map(operator.itemgetter(self.column), map(operator.attrgetter('cells'), self.rows))
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return list(map(operator.itemgetter(self.column), map(operator.attrgetter('cells'), self.rows[position])))
+        return self.rows[position].cells[self.column]
+
+# The part of unpaged_data the view can see: the first 'length' rows of a list (or ColumnarRows).  Loading
+#   another page just makes a longer window, the rows themselves never get copied.
+class RowWindow():
+    def __init__(self, rows, length):
+        self.rows = rows
+        self.length = max(min(length, len(rows)), 0)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        rows = self.rows
+        return (rows[position] for position in range(self.length))
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self.rows[slice(*position.indices(self.length))]
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError("row window index out of range")
+        return self.rows[position]
 
 if __name__ == "__main__":
 
@@ -1 +1 @@
-from .SmartTable import SmartRow, SmartTable
+from .SmartTable import SmartRow, SmartTable, batchUpdate
@@ -0,0 +1,57 @@
+import sys
+import os
+import random
+import time
+import tracemalloc
+from collections import UserList
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from SmartTable import SmartRow
+
+# Compares how much memory a table's rows take, between the old UserList SmartRow and the __slots__ one.
+#   Run it as 'python tests/benchrows.py [rows]', 1,000,000 rows of 3 columns by default.
+
+# The way SmartRow used to be, for comparison.
+class UserListSmartRow(UserList):
+    def __init__(self, data=[]):
+        self.hidden = False
+        self.formulas = [None] * len(data)
+        self.smart_tables = []
+        super().__init__(data)
+
+# Builds a row of 'row_class' for each list in 'values' the way SmartTableModel does, and returns the rows, the
+#   memory they take up and how long they took to make.  The values are made beforehand so only the rows count.
+def measureRows(row_class, values, table):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = [row_class(row_values) for row_values in values]
+    if row_class is SmartRow:
+        shared_tables = (table,)
+        for row in rows:
+            row.smart_tables = shared_tables
+    else:
+        for row in rows:
+            row.smart_tables.append(table)
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, current, seconds
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    values = [[random.randrange(-100, 101), random.randrange(-100, 101), random.randrange(-100, 101)] for i in range(row_count)]
+    # Anything will do as the table, it only gets stored.
+    table = object()
+
+    results = {}
+    for row_class in (UserListSmartRow, SmartRow):
+        rows, size, seconds = measureRows(row_class, values, table)
+        start = time.perf_counter()
+        total = sum(row[1] for row in rows)
+        read_seconds = time.perf_counter() - start
+        results[row_class.__name__] = size
+        print(f"{row_class.__name__:>17}: {size / 1e6:8.1f} MB, {size / row_count:6.1f} bytes/row, "
+              f"built in {seconds:.2f}s, one column read in {read_seconds:.2f}s")
+        del rows
+
+    print(f"SmartRow takes {results['SmartRow'] / results['UserListSmartRow']:.0%} of the memory of the old one")
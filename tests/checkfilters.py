@@ -0,0 +1,37 @@
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from SmartTable.SmartTable import SmartColumn, RegexPredicate
+
+# Checks that filtering a whole column (with the trigram index and the other shortcuts) finds exactly the rows
+#   that checking each value on its own does.  Run it as 'python tests/checkfilters.py', it prints the patterns
+#   that don't agree and exits with 1 if there are any.
+
+# Regexes that have caught out the shortcuts before.
+patterns = [
+    'abc', '^abc', 'ab+cd', 'abc?d', 'a.*bcd', '(abc)?d', '[ab]bcd', 'abc|xyz',
+    # Escapes with more characters after them than the two looked at
+    r'\x41bcd', r'Abcd', r'\N{LATIN CAPITAL LETTER A}bcd', r'\101bcd', r'(A)\1bcd', r'\0bcd',
+]
+
+if __name__ == "__main__":
+    random.seed(1)
+    # Big enough for the trigram index to get used.
+    row_count = 2 * SmartColumn.trigram_minimum_rows
+    pieces = ['Abcd', 'AAbcd', 'abcd', 'xyz', 'a-bcd', '41bcd', '\0bcd', 'q']
+    # The row number keeps the values distinct, so the distinct value shortcut doesn't take over.
+    values = SmartColumn(''.join(random.choices(pieces, k=3)) + str(row) for row in range(row_count))
+    values.trigramIndex()
+
+    failures = 0
+    for pattern in patterns:
+        predicate = RegexPredicate(pattern)
+        expected = bytearray(1 if predicate.matches(value) else 0 for value in values)
+        found = predicate.evaluateColumn(values)
+        if found != expected:
+            failures += 1
+            print(f"{pattern!r}: {sum(found)} rows found, should be {sum(expected)}")
+    print(f"{len(patterns) - failures} of {len(patterns)} patterns agree")
+    sys.exit(1 if failures else 0)